@@ -2,8 +2,9 @@ from flask import Blueprint, request, jsonify, g
 from datetime import datetime
 import bcrypt
 
-from models import db, User
-from utils.jwt_utils import admin_required
+from models import db, User, UserStats, PartyNameKey
+from utils.jwt_utils import admin_required, invalidate_auth_user, auth_cache
+from utils.search_cache import cache_stats
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -117,6 +118,7 @@ def admin_update_user():
         user.password_hash = hashed
 
     db.session.commit()
+    invalidate_auth_user(user.id)
 
     return jsonify({"message": "User updated", "user": user.as_dict()}), 200
 
@@ -146,6 +148,7 @@ def admin_set_status():
 
     user.is_active = bool(status)
     db.session.commit()
+    invalidate_auth_user(user.id)
 
     return jsonify({"message": "Status updated", "user": user.as_dict()}), 200
 
@@ -190,6 +193,7 @@ def admin_set_expiry():
             user.is_active = True
 
     db.session.commit()
+    invalidate_auth_user(user.id)
 
     return jsonify({"message": "Expiry updated", "user": user.as_dict()}), 200
 
@@ -213,7 +217,19 @@ def admin_delete_user():
     if not user:
         return jsonify({"error": "User not found"}), 404
 
+    UserStats.query.filter_by(user_id=user.id).delete()
+    PartyNameKey.query.filter_by(user_id=user.id).delete()
     db.session.delete(user)
     db.session.commit()
+    invalidate_auth_user(int(user_id))
 
     return jsonify({"message": "User deleted successfully"}), 200
+
+
+# ------------------------------------------
+# CACHE STATS (hit / miss counters for sizing)
+# ------------------------------------------
+@admin_bp.route("/cache_stats", methods=["GET"])
+@admin_required
+def admin_cache_stats():
+    return jsonify({**cache_stats(), "auth_users": auth_cache.stats()}), 200
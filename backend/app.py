@@ -13,14 +13,26 @@ from export_routes import export_bp
 from dashboard_routes import dashboard_bp
 # Utils
 from utils.cleanup import start_cleanup_thread
-from utils.fts_utils import ensure_fts_table
+from utils.job_queue import start_job_workers
+from utils.fts_utils import ensure_fts_table, ensure_pg_search, ensure_trigram_table
+from utils.schema_utils import ensure_columns
+from utils.user_stats import ensure_user_stats
+from utils.name_keys import ensure_party_names
+from utils.db_utils import engine_options, install_connect_hook
+from commands import register_commands
 from dotenv import load_dotenv
 load_dotenv()   # will read .env in project root
 
 
-def create_app():
+def create_app(workers=False):
+    """
+    workers=True starts this process's background threads (upload queue,
+    file cleanup). Only the web entrypoints ask for them: `flask --app app
+    <command>` and scripts get an app that never claims upload jobs.
+    """
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
 
     db.init_app(app)
 
@@ -49,10 +61,25 @@ def create_app():
     app.register_blueprint(export_bp)
     app.register_blueprint(dashboard_bp)
 
+    # CLI maintenance commands (flask --app app ...)
+    register_commands(app)
+
     # ---- DATABASE SETUP ----
     with app.app_context():
+        install_connect_hook(db.engine, app.config)
         db.create_all()
-        ensure_fts_table(db)
+        ensure_columns(db)
+        # text search: FTS5 on SQLite, tsvector + pg_trgm on Postgres, else LIKE
+        if ensure_fts_table(db):
+            app.config["SEARCH_BACKEND"] = "fts5"
+        elif ensure_pg_search(db):
+            app.config["SEARCH_BACKEND"] = "postgres"
+        else:
+            app.config["SEARCH_BACKEND"] = "like"
+        # infix name / propertydescription / docno filters (Postgres: pg_trgm above)
+        app.config["TRIGRAM_ENABLED"] = ensure_trigram_table(db)
+        ensure_user_stats(app)
+        ensure_party_names(app)
 
         # -----------------------------------------------------------
         # ✅ ADD SUPER ADMIN CREATION CODE HERE (INSIDE app_context)
@@ -86,13 +113,17 @@ def create_app():
             print(" Failed to create super admin:", e)
         # -----------------------------------------------------------
 
-    # Start cleanup thread
-    start_cleanup_thread(app)
+    if workers:
+        # Start cleanup thread
+        start_cleanup_thread(app)
+
+        # Start upload queue workers (also resumes jobs left by a restart)
+        start_job_workers(app)
 
     return app
 
 
 
 if __name__ == "__main__":
-    app = create_app()
+    app = create_app(workers=True)
     app.run(debug=True)
\ No newline at end of file
@@ -110,7 +110,7 @@ def reset_password():
 @auth_bp.route("/profile", methods=["GET"])
 @jwt_required
 def profile():
-    user = g.current_user
+    user = User.query.get(g.current_user.id)
     return jsonify(user.as_dict())
 
 
@@ -120,7 +120,7 @@ def profile():
 @auth_bp.route("/profile/update", methods=["PUT"])
 @jwt_required
 def update_profile():
-    user = g.current_user
+    user = User.query.get(g.current_user.id)
     data = request.get_json()
 
     updated = False
@@ -0,0 +1,116 @@
+"""
+Micro-benchmark: row-wise vs columnar normalization of parsed rows.
+
+    python benchmarks/bench_extractor.py [rows]     # default 50000 rows
+
+The file is parsed once (iter_raw_rows), then the same rows are normalized
+two ways: "row-wise" is the previous path, normalize_date() twice and
+safe_float() twice per row. "columnar" is what iter_row_batches() does:
+extractor.normalize_batch() per 2000-row batch, column by column.
+The .xls input needs xlwt to be generated and is skipped without it.
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook  # noqa: E402
+
+from extractor import iter_raw_rows, normalize_batch, normalize_date  # noqa: E402
+from utils.helper_utils import safe_float  # noqa: E402
+
+HEADER = ["SroName", "DocNo", "DocName", "RegistrationDate", "SellerParty", "PurchaserParty",
+          "PropertyDescription", "AreaName", "Consideration_Amt", "MarketValue", "DateOfExecution"]
+
+
+def gen_rows(n_rows, seed=0):
+    rnd = random.Random(seed)
+    for i in range(n_rows):
+        yield [
+            f"हवेली {rnd.randint(1, 20)}", 1000 + i, rnd.choice(["खरेदीखत", "गहाणखत", "करारनामा"]),
+            f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{rnd.randint(2010, 2024)}",
+            "Ramesh Patil", "सुरेश जाधव", f"सर्वे नं. {rnd.randint(1, 500)}/{rnd.randint(1, 9)}",
+            f"Area {rnd.randint(1, 50)}", f"{rnd.randint(10, 900)},000", rnd.randint(10000, 9000000),
+            datetime.date(rnd.randint(2010, 2024), rnd.randint(1, 12), rnd.randint(1, 28)).strftime("%d-%m-%Y"),
+        ]
+
+
+def make_xlsx(path, n_rows):
+    # regular (not write-only) workbook: shared strings + <dimension>, like Excel output
+    wb = Workbook()
+    ws = wb.active
+    ws.append(HEADER)
+    for row in gen_rows(n_rows):
+        ws.append(row)
+    wb.save(path)
+
+
+def make_xls(path, n_rows):
+    import xlwt
+    wb = xlwt.Workbook()
+    ws = wb.add_sheet("Sheet1")
+    for c, h in enumerate(HEADER):
+        ws.write(0, c, h)
+    for r, row in enumerate(gen_rows(min(n_rows, 65535)), start=1):
+        for c, v in enumerate(row):
+            ws.write(r, c, v)
+    wb.save(path)
+
+
+def rowwise(rows):
+    for rec in rows:
+        rec["registrationdate"] = normalize_date(rec.get("registrationdate"))
+        rec["dateofexecution"] = normalize_date(rec.get("dateofexecution"))
+        rec["consideration_amt"] = safe_float(rec.get("consideration_amt"))
+        rec["marketvalue"] = safe_float(rec.get("marketvalue"))
+
+
+def columnar(rows, batch_size=2000):
+    date_cache = {}
+    for i in range(0, len(rows), batch_size):
+        normalize_batch(rows[i:i + batch_size], date_cache)
+
+
+def bench(label, path):
+    t0 = time.perf_counter()
+    raw = list(iter_raw_rows(path))
+    read_s = time.perf_counter() - t0
+    n = len(raw)
+    print(f"{label:5s} read      rows={n:7d}  {read_s:6.2f}s  {n / read_s:9.0f} rows/s")
+
+    timings = {}
+    for name, fn in (("row-wise", rowwise), ("columnar", columnar)):
+        rows = [dict(r) for r in raw]
+        t0 = time.perf_counter()
+        fn(rows)
+        timings[name] = time.perf_counter() - t0
+        total = read_s + timings[name]
+        print(f"{label:5s} {name:9s} normalize {timings[name]:6.2f}s  {n / timings[name]:9.0f} rows/s"
+              f"  | read+normalize {n / total:7.0f} rows/s")
+
+    print(f"{label:5s} normalization speedup: {timings['row-wise'] / timings['columnar']:.1f}x")
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx = os.path.join(tmp, "bench.xlsx")
+        make_xlsx(xlsx, n_rows)
+        bench("xlsx", xlsx)
+
+        try:
+            xls = os.path.join(tmp, "bench.xls")
+            make_xls(xls, n_rows)
+        except ImportError:
+            print("xls   skipped (pip install xlwt to generate the input)")
+        else:
+            bench("xls", xls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: streaming lxml reader vs the original BeautifulSoup reader on an
+HTML-disguised UTF-16 .xls file (the format most registry exports use).
+
+    python benchmarks/bench_html_xls.py [rows]     # default 100000 rows
+
+Each parser runs in its own process so peak RSS is measured independently.
+"""
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import parse_html_xls, iter_html_table_rows, iter_html_table_rows_soup  # noqa: E402
+
+NAMES = ["रमेश पाटील", "Ramesh Patil", "सुरेश जाधव", "Anant Kulkarni", "Sunita Deshmukh"]
+DOCNAMES = ["खरेदीखत", "गहाणखत", "करारनामा", "Notice of Intimation"]
+
+
+def make_file(path, n_rows, seed=0):
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-16") as f:
+        f.write("<html><body><table>\n<tr><th>SroName</th><th>DocNo</th><th>DocName</th>"
+                "<th>RegistrationDate</th><th>SellerParty</th><th>PurchaserParty</th>"
+                "<th>PropertyDescription</th><th>AreaName</th><th>Consideration_Amt</th>"
+                "<th>MarketValue</th><th>DateOfExecution</th></tr>\n")
+        for i in range(n_rows):
+            f.write(
+                f"<tr><td>हवेली {rnd.randint(1, 20)}</td><td>{1000 + i}</td>"
+                f"<td>{rnd.choice(DOCNAMES)}</td>"
+                f"<td>{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{rnd.randint(2010, 2024)}</td>"
+                f"<td>{rnd.choice(NAMES)}</td><td>{rnd.choice(NAMES)}</td>"
+                f"<td>सर्वे नं. {rnd.randint(1, 500)}/{rnd.randint(1, 9)} गट नं {rnd.randint(1, 900)}</td>"
+                f"<td>Area {rnd.randint(1, 50)}</td><td>{rnd.randint(10, 900)},000</td>"
+                f"<td>{rnd.randint(10000, 9000000)}</td>"
+                f"<td>{rnd.randint(1, 28):02d}-{rnd.randint(1, 12):02d}-{rnd.randint(2010, 2024)}</td></tr>\n"
+            )
+        f.write("</table></body></html>\n")
+
+
+def run(reader_name, path, out):
+    reader = {"lxml": iter_html_table_rows, "bs4": iter_html_table_rows_soup}[reader_name]
+    t0 = time.perf_counter()
+    n = 0
+    for _ in parse_html_xls(path, row_reader=reader):
+        n += 1
+    elapsed = time.perf_counter() - t0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    out.put((reader_name, n, elapsed, peak_mb))
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    ctx = get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.xls")
+        make_file(path, n_rows)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"{n_rows} rows, {size_mb:.1f} MB (UTF-16)")
+
+        results = {}
+        for name in ("bs4", "lxml"):
+            q = ctx.Queue()
+            p = ctx.Process(target=run, args=(name, path, q))
+            p.start()
+            res = q.get()
+            p.join()
+            results[name] = res
+            _, n, elapsed, peak = res
+            print(f"{name:5s} rows={n:7d}  {elapsed:7.2f}s  {n / elapsed:9.0f} rows/s  peak RSS {peak:7.1f} MB")
+
+        print(f"speedup: {results['bs4'][2] / results['lxml'][2]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
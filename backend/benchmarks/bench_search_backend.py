@@ -0,0 +1,128 @@
+"""
+Benchmark: ingest + /search latency on whatever DATABASE_URL points at.
+
+    DATABASE_URL=postgresql://bench@localhost/bench python benchmarks/bench_search_backend.py [rows] [totals.json]
+    python benchmarks/bench_search_backend.py [rows] [totals.json]   # temp SQLite file, default 100000 rows
+
+Runs the same upload and query set on SQLite (FTS5) and on a local
+Postgres (COPY ingest, tsvector for q, pg_trgm for the substring filters),
+so the two backends can be compared side by side. The Postgres database
+should be empty and disposable: the run uploads into it. The search caches
+are cleared before every request, so each timing is a real query.
+
+The generated file is the same for a given row count, so the backends must
+agree on every total. With a totals file the first run records its totals
+and later runs compare against them:
+
+    python benchmarks/bench_search_backend.py 100000 totals.json
+    DATABASE_URL=postgresql://... python benchmarks/bench_search_backend.py 100000 totals.json
+
+Exits 1 when the ingest fails or loses rows, a query finds nothing, or a
+total differs from the recorded one.
+"""
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from benchmarks.bench_html_xls import make_file  # noqa: E402
+
+QUERIES = [
+    {"q": "Patil"},
+    {"q": "पाटील"},
+    {"q": "Ramesh Pat"},
+    {"purchaser": "Ramesh"},
+    {"seller": "जाधव"},
+    {"propertydescription": "गट नं 12"},
+    {"docno": "100"},
+    {"docname": "खरेदीखत", "registrationdate": "2018"},
+]
+REPEAT = 5
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    totals_path = sys.argv[2] if len(sys.argv) > 2 else None
+    tmp = tempfile.mkdtemp()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmp}/bench.db")
+    os.environ["UPLOAD_FOLDER"] = f"{tmp}/uploads"
+
+    from app import create_app
+    from utils.search_cache import result_cache, facet_cache
+
+    app = create_app(workers=True)
+    client = app.test_client()
+    token = client.post("/login", json={
+        "email": app.config["SUPER_ADMIN_EMAIL"], "password": app.config["SUPER_ADMIN_PW"]
+    }).get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    path = os.path.join(tmp, "bench.xls")
+    make_file(path, n_rows)
+    with open(path, "rb") as f:
+        data = f.read()
+
+    driver = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).drivername
+    print(f"search backend {app.config['SEARCH_BACKEND']} on {driver}")
+
+    t0 = time.perf_counter()
+    r = client.post("/upload", data={"table_name": "bench", "files": [(io.BytesIO(data), "bench.xls")]},
+                    headers=headers, content_type="multipart/form-data")
+    job_id = r.get_json()["job_id"]
+    while True:
+        state = client.get(f"/upload/status/{job_id}", headers=headers).get_json()
+        if state["status"] in ("done", "failed"):
+            break
+        time.sleep(0.2)
+    elapsed = time.perf_counter() - t0
+    print(f"  ingest {state['status']}: {state.get('inserted', 0)} rows in {elapsed:.1f}s "
+          f"({state.get('inserted', 0) / elapsed:.0f} rows/s, parse included)")
+
+    problems = []
+    if state["status"] != "done" or state.get("inserted") != n_rows:
+        problems.append(f"ingest {state['status']} with {state.get('inserted')} of {n_rows} rows")
+
+    totals = {}
+    for params in QUERIES:
+        times = []
+        for _ in range(REPEAT):
+            result_cache.clear()
+            facet_cache.clear()
+            t0 = time.perf_counter()
+            r = client.get("/search", query_string=params, headers=headers)
+            times.append(time.perf_counter() - t0)
+        body = r.get_json()
+        print(f"  {str(params):55s} total={body.get('total')!s:>7}  "
+              f"median {statistics.median(times) * 1000:7.1f} ms")
+        totals[json.dumps(params, ensure_ascii=False, sort_keys=True)] = body.get("total")
+        if not body.get("total"):
+            problems.append(f"{params} found nothing")
+
+    if totals_path and os.path.exists(totals_path):
+        with open(totals_path, encoding="utf-8") as f:
+            expected = json.load(f)
+        if expected.get("rows") == n_rows:
+            for key, total in totals.items():
+                if key in expected["totals"] and expected["totals"][key] != total:
+                    problems.append(f"{key}: total {total}, recorded {expected['totals'][key]}")
+        else:
+            problems.append(f"{totals_path} was recorded for {expected.get('rows')} rows, not {n_rows}")
+    elif totals_path:
+        with open(totals_path, "w", encoding="utf-8") as f:
+            json.dump({"rows": n_rows, "totals": totals}, f, ensure_ascii=False, indent=1)
+        print(f"  totals recorded in {totals_path}")
+
+    for p in problems:
+        print(f"✘ {p}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Concurrency check: searches running while a bulk upload is ingested.
+
+    python benchmarks/bench_sqlite_concurrency.py [rows] [readers]   # default 100000 rows, 4 readers
+
+For each DB_PROFILE ("plain" = SQLite defaults, "tuned" = WAL + PRAGMAs from
+utils/db_utils.py) a fresh app and database are created in their own
+process. Reader processes (one app each, like gunicorn workers) loop over
+/search while the upload job worker inserts the file; the run reports
+ingest time, search latency and every failed search ("database is
+locked" shows up here as a 500). After the ingest the hot queries of
+`flask check-indexes` are EXPLAINed on the loaded database.
+
+Exits 1 when an ingest fails or loses rows, a hot query no longer uses its
+index, or a search fails under the tuned profile (the plain profile is the
+baseline and may lock).
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_html_xls import make_file  # noqa: E402
+
+QUERIES = [
+    {"q": "Patil"}, {"q": "पाटील"}, {"purchaser": "Ramesh"}, {"docname": "खरेदीखत"},
+    {"registrationdate": "2018"}, {"propertydescription": "गट नं"}, {"docno": "100"},
+]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def setup_env(profile, tmp, upload_workers):
+    os.environ.update({
+        "DB_PROFILE": profile,
+        "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+        "UPLOAD_FOLDER": f"{tmp}/uploads",
+        "EXPORT_FOLDER": f"{tmp}/exports",
+        "UPLOAD_WORKERS": str(upload_workers),
+        "JWT_SECRET": "bench" * 8,     # the readers verify the parent's token
+    })
+
+
+def reader(profile, tmp, headers, seed, ready, stop, out):
+    """
+    One search "worker process": its own app, pool and connections
+    (no upload workers, the ingest runs in the parent).
+    """
+    setup_env(profile, tmp, 0)
+    from app import create_app
+
+    client = create_app().test_client()
+    rnd = random.Random(seed)
+    latencies, errors = [], []
+    ready.set()
+
+    while not stop.is_set():
+        params = dict(rnd.choice(QUERIES), page=rnd.randint(1, 3))
+        t0 = time.perf_counter()
+        try:
+            r = client.get("/search", query_string=params, headers=headers)
+            ok, msg = r.status_code == 200, f"HTTP {r.status_code}: {r.get_data(as_text=True)}"
+        except Exception as e:       # noqa: BLE001 - report whatever the DB raised
+            ok, msg = False, repr(e)
+        latencies.append(time.perf_counter() - t0)
+        if not ok:
+            errors.append(msg[:160])
+
+    out.put((latencies, errors))
+
+
+def run(profile, path, n_readers):
+    ctx = get_context("spawn")
+    tmp = tempfile.mkdtemp()
+    setup_env(profile, tmp, 1)
+    from app import create_app
+
+    app = create_app(workers=True)
+    client = app.test_client()
+    token = client.post("/login", json={
+        "email": app.config["SUPER_ADMIN_EMAIL"], "password": app.config["SUPER_ADMIN_PW"]
+    }).get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    stop, out = ctx.Event(), ctx.Queue()
+    readers = []
+    for i in range(n_readers):
+        ready = ctx.Event()
+        p = ctx.Process(target=reader, args=(profile, tmp, headers, i, ready, stop, out))
+        p.start()
+        ready.wait()
+        readers.append(p)
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    t0 = time.perf_counter()
+    r = client.post("/upload", data={"table_name": "bench", "files": [(io.BytesIO(data), "bench.xls")]},
+                    headers=headers, content_type="multipart/form-data")
+    job_id = r.get_json()["job_id"]
+    while True:
+        state = client.get(f"/upload/status/{job_id}", headers=headers).get_json()
+        if state["status"] in ("done", "failed"):
+            break
+        time.sleep(0.2)
+    ingest = time.perf_counter() - t0
+
+    stop.set()
+    latencies, errors = [], []
+    for _ in readers:
+        lat, err = out.get()
+        latencies += lat
+        errors += err
+    for p in readers:
+        p.join()
+
+    from commands import check_hot_queries
+    with app.app_context():
+        unindexed = [f"{label}: {index}" for label, index, _, ok in check_hot_queries() if not ok]
+
+    return (state["status"], state.get("inserted", 0), ingest, latencies, errors, unindexed)
+
+
+def run_profile(profile, path, n_readers, out):
+    out.put(run(profile, path, n_readers))
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    ctx = get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.xls")
+        make_file(path, n_rows)
+        print(f"{n_rows} rows, {n_readers} search processes")
+        problems = []
+
+        for profile in ("plain", "tuned"):
+            q = ctx.Queue()
+            p = ctx.Process(target=run_profile, args=(profile, path, n_readers, q))
+            p.start()
+            status, inserted, ingest, latencies, errors, unindexed = q.get()
+            p.join()
+            print(f"  {profile:6s} ingest {status} {inserted} rows in {ingest:6.1f}s  "
+                  f"searches={len(latencies):5d}  p50 {percentile(latencies, 0.5) * 1000:6.0f} ms  "
+                  f"p95 {percentile(latencies, 0.95) * 1000:6.0f} ms  "
+                  f"max {max(latencies or [0]) * 1000:6.0f} ms  errors={len(errors)}")
+            for e in errors[:5]:
+                print(f"      {e}")
+
+            if status != "done" or inserted != n_rows:
+                problems.append(f"{profile}: ingest {status} with {inserted} of {n_rows} rows")
+            if profile == "tuned" and errors:
+                problems.append(f"{profile}: {len(errors)} failed searches")
+            problems += [f"{profile}: not indexed: {u}" for u in unindexed]
+
+    for p in problems:
+        print(f"✘ {p}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: python-docx Word report vs the XML-template generator.
+
+    python benchmarks/bench_word_export.py [deeds ...]     # default 1000 10000
+
+"python-docx" is the previous export_selected_word path (a paragraph and a
+table object per deed, write_word_python). "template" is write_word: one
+deed laid out once, then its XML filled in bulk. Each run happens in its
+own process so peak RSS is measured independently.
+"""
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.word_export import write_word, write_word_python  # noqa: E402
+
+Deed = namedtuple("Deed", "id docno docname registrationdate sroname "
+                          "sellername purchasername propertydescription")
+
+NAMES = ["रमेश पाटील", "Ramesh Patil", "सुरेश जाधव", "Anant Kulkarni", "Sunita Deshmukh"]
+DOCNAMES = ["खरेदीखत", "गहाणखत", "करारनामा", "Notice of Intimation"]
+
+
+def make_deeds(n, seed=0):
+    rnd = random.Random(seed)
+    return [
+        Deed(
+            i, str(1000 + i), rnd.choice(DOCNAMES),
+            f"{rnd.randint(2010, 2024)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            f"हवेली {rnd.randint(1, 20)}", rnd.choice(NAMES), rnd.choice(NAMES),
+            f"सर्वे नं. {rnd.randint(1, 500)}/{rnd.randint(1, 9)} गट नं {rnd.randint(1, 900)} "
+            f"CTS {rnd.randint(1, 9000)} क्षेत्र {rnd.randint(1, 99)} चौ.मी.",
+        )
+        for i in range(n)
+    ]
+
+
+def run(writer_name, n, path, out):
+    writer = {"python-docx": write_word_python, "template": write_word}[writer_name]
+    deeds = make_deeds(n)
+    t0 = time.perf_counter()
+    written = writer(path, deeds)
+    elapsed = time.perf_counter() - t0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    out.put((writer_name, written, elapsed, peak_mb, os.path.getsize(path)))
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000]
+    ctx = get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            print(f"{n} deeds")
+            results = {}
+            for name in ("python-docx", "template"):
+                path = os.path.join(tmp, f"{name}_{n}.docx")
+                q = ctx.Queue()
+                p = ctx.Process(target=run, args=(name, n, path, q))
+                p.start()
+                res = q.get()
+                p.join()
+                results[name] = res
+                _, written, elapsed, peak, size = res
+                print(f"  {name:11s} deeds={written:6d}  {elapsed:7.2f}s  {written / elapsed:8.0f} deeds/s  "
+                      f"peak RSS {peak:6.1f} MB  file {size / 1024:7.0f} KB")
+
+            print(f"  speedup: {results['python-docx'][2] / results['template'][2]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
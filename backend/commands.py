@@ -0,0 +1,165 @@
+import sys
+
+import click
+from sqlalchemy import text
+
+from models import db
+
+# Hot read paths and the index each must use: (label, SQL, index name).
+# Kept in step with the queries in search_routes.
+HOT_QUERIES = [
+    (
+        "search: table filter, newest first",
+        "SELECT d.id FROM documents d WHERE d.user_id = :uid AND d.table_name = :t "
+        "ORDER BY d.id DESC LIMIT 50",
+        "ix_documents_user_table_id",
+    ),
+    (
+        "search: docname facet counts",
+        "SELECT d.docname, COUNT(*) FROM documents d WHERE d.user_id = :uid "
+        "GROUP BY d.docname ORDER BY COUNT(*) DESC",
+        "ix_documents_user_docname",
+    ),
+    (
+        "search: docname_filter",
+        "SELECT d.id FROM documents d WHERE d.user_id = :uid AND d.docname = :t "
+        "ORDER BY d.id DESC LIMIT 50",
+        "ix_documents_user_docname",
+    ),
+    (
+        "search: registration year",
+        "SELECT d.id FROM documents d WHERE d.user_id = :uid AND d.registration_year = :y "
+        "ORDER BY d.id DESC LIMIT 50",
+        "ix_documents_user_year",
+    ),
+    (
+        "search: registration date range",
+        "SELECT d.id FROM documents d WHERE d.user_id = :uid "
+        "AND d.registration_date >= :d1 AND d.registration_date <= :d2 "
+        "ORDER BY d.id DESC LIMIT 50",
+        "ix_documents_user_regdate",
+    ),
+    (
+        "search: consideration range",
+        "SELECT d.id FROM documents d WHERE d.user_id = :uid "
+        "AND d.consideration_amt >= :lo AND d.consideration_amt <= :hi "
+        "ORDER BY d.id DESC LIMIT 50",
+        "ix_documents_user_consideration",
+    ),
+    (
+        "search: market value range",
+        "SELECT d.id FROM documents d WHERE d.user_id = :uid "
+        "AND d.marketvalue >= :lo AND d.marketvalue <= :hi "
+        "ORDER BY d.id DESC LIMIT 50",
+        "ix_documents_user_marketvalue",
+    ),
+    (
+        "search: phonetic name",
+        "SELECT d.id FROM documents d WHERE d.user_id = :uid AND d.id IN ("
+        "SELECT k.document_id FROM party_name_keys k WHERE k.user_id = :uid "
+        "AND k.phonetic IN ('ptl', 'rms') AND k.role = 'purchaser' "
+        "GROUP BY k.document_id HAVING COUNT(DISTINCT k.phonetic) = 2) "
+        "ORDER BY d.id DESC LIMIT 50",
+        "ix_party_name_keys_phonetic",
+    ),
+    (
+        "selected rows join",
+        "SELECT d.id FROM selected_entries s "
+        "JOIN documents d ON d.id = s.document_id AND d.user_id = s.user_id "
+        "WHERE s.user_id = :uid ORDER BY d.id DESC",
+        "ux_selected_entries_user_document",
+    ),
+]
+HOT_QUERY_PARAMS = {
+    "uid": 1, "t": "x", "y": 2020, "d1": "2020-01-01", "d2": "2020-03-31", "lo": 100000, "hi": 200000,
+}
+
+
+def explain(sql):
+    """
+    Query plan text for `sql` on the current database.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        rows = db.session.execute(text("EXPLAIN QUERY PLAN " + sql), HOT_QUERY_PARAMS)
+        return "\n".join(r[-1] for r in rows)
+
+    # tiny or freshly loaded tables make postgres prefer a seq scan;
+    # ask which index it would use once scanning is not an option
+    db.session.execute(text("SET LOCAL enable_seqscan = off"))
+    rows = db.session.execute(text("EXPLAIN " + sql), HOT_QUERY_PARAMS)
+    return "\n".join(r[0] for r in rows)
+
+
+def check_hot_queries():
+    """
+    EXPLAIN every hot query: [(label, index, plan, ok)], ok when the plan
+    uses the query's index. Used by check-indexes and the benchmarks.
+    """
+    results = []
+    for label, sql, index in HOT_QUERIES:
+        plan = explain(sql)
+        results.append((label, index, plan, index in plan))
+    db.session.rollback()
+    return results
+
+
+def register_commands(app):
+    """
+    Maintenance commands, run with `flask --app app <command>`.
+    """
+
+    @app.cli.command("reconcile-stats")
+    @click.option("--user-id", type=int, default=None, help="Only this user (default: everyone).")
+    def reconcile_stats(user_id):
+        """Recompute the per-user dashboard counters from scratch."""
+        from utils.user_stats import reconcile_user_stats
+
+        n = reconcile_user_stats(user_id)
+        db.session.commit()
+        click.echo(f"✔ Recomputed stats for {n} user(s)")
+
+    @app.cli.command("backfill-dates")
+    @click.option("--user-id", type=int, default=None, help="Only this user (default: everyone).")
+    @click.option("--batch-size", type=int, default=5000, show_default=True)
+    def backfill_dates(user_id, batch_size):
+        """Fill the typed date / year columns from the text dates."""
+        from utils.date_backfill import backfill_document_dates
+
+        scanned, updated = backfill_document_dates(user_id, batch_size)
+        click.echo(f"✔ Scanned {scanned} rows, filled dates on {updated}")
+
+    @app.cli.command("backfill-natural-keys")
+    @click.option("--user-id", type=int, default=None, help="Only this user (default: everyone).")
+    @click.option("--batch-size", type=int, default=5000, show_default=True)
+    def backfill_natural_keys_command(user_id, batch_size):
+        """Fill the dedupe key (sro|docno|year) on rows stored without one."""
+        from utils.key_backfill import backfill_natural_keys
+
+        scanned, keyed = backfill_natural_keys(user_id, batch_size)
+        click.echo(f"✔ Scanned {scanned} rows, keyed {keyed}")
+
+    @app.cli.command("rebuild-name-keys")
+    @click.option("--user-id", type=int, default=None, help="Only this user (default: everyone).")
+    @click.option("--batch-size", type=int, default=5000, show_default=True)
+    def rebuild_name_keys(user_id, batch_size):
+        """Recompute the purchaser / seller name keys for match=phonetic."""
+        from utils.name_keys import rebuild_party_names
+
+        n = rebuild_party_names(user_id, batch_size)
+        click.echo(f"✔ Indexed names of {n} documents")
+
+    @app.cli.command("check-indexes")
+    @click.option("--verbose", is_flag=True, help="Print every plan, not just failures.")
+    def check_indexes(verbose):
+        """EXPLAIN the hot queries; exit 1 if one no longer uses its index."""
+        failed = 0
+        for label, index, plan, ok in check_hot_queries():
+            failed += not ok
+            click.echo(f"{'✔' if ok else '✘'} {label}: {index}")
+            if verbose or not ok:
+                click.echo("    " + plan.replace("\n", "\n    "))
+
+        if failed:
+            click.echo(f"{failed} hot query(ies) not using their index")
+            sys.exit(1)
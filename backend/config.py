@@ -14,14 +14,69 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Engine profile (utils/db_utils.py). SQLite "tuned" = WAL + the PRAGMAs
+    # below on every connection; "plain" = SQLite defaults.
+    DB_PROFILE = os.environ.get("DB_PROFILE", "tuned")
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+    SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+    # Pool per process (SQLite file or server database; in-memory SQLite keeps its own)
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+
+    # Search
+    SEARCH_COUNT_ESTIMATE_CAP = int(os.environ.get("SEARCH_COUNT_ESTIMATE_CAP", "10000"))
+    SEARCH_RESULT_CACHE_SIZE = int(os.environ.get("SEARCH_RESULT_CACHE_SIZE", "2048"))
+    SEARCH_RESULT_CACHE_TTL = int(os.environ.get("SEARCH_RESULT_CACHE_TTL", "300"))
+    SEARCH_FACET_CACHE_SIZE = int(os.environ.get("SEARCH_FACET_CACHE_SIZE", "1024"))
+    SEARCH_FACET_CACHE_TTL = int(os.environ.get("SEARCH_FACET_CACHE_TTL", "300"))
+
     # Uploads
     UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", os.path.join(BASE_DIR, "uploads"))
 
+    # Ingestion: rows per INSERT batch / transaction
+    INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "2000"))
+    # Row-level dedup on (sroname, docno, year) per user: off / skip / update.
+    # An upload can override it with the "dedupe" form field.
+    INGEST_DEDUPE_MODE = os.environ.get("INGEST_DEDUPE_MODE", "off")
+    # Parser processes for multi-file uploads (1 = parse in the upload thread).
+    # Per web process: gunicorn -w 4 with 2 here is up to 8 parsers on the host.
+    INGEST_PARSE_WORKERS = int(os.environ.get("INGEST_PARSE_WORKERS", "2"))
+    # shut the parser pool down after this long without an upload
+    INGEST_PARSE_IDLE_SECONDS = float(os.environ.get("INGEST_PARSE_IDLE_SECONDS", "300"))
+
+    # Upload job queue (rows in upload_jobs)
+    UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "1"))          # threads per web process
+    UPLOAD_MAX_RUNNING = int(os.environ.get("UPLOAD_MAX_RUNNING", "2"))  # across all processes
+    UPLOAD_MAX_ATTEMPTS = int(os.environ.get("UPLOAD_MAX_ATTEMPTS", "3"))
+    UPLOAD_JOB_STALE_SECONDS = int(os.environ.get("UPLOAD_JOB_STALE_SECONDS", "300"))
+    UPLOAD_POLL_SECONDS = float(os.environ.get("UPLOAD_POLL_SECONDS", "2"))
+    # status long-poll: longest wait (keep well under the gunicorn worker
+    # timeout, 30s by default) and the DB re-read interval while waiting
+    UPLOAD_LONGPOLL_SECONDS = float(os.environ.get("UPLOAD_LONGPOLL_SECONDS", "20"))
+    UPLOAD_LONGPOLL_RECHECK_SECONDS = float(os.environ.get("UPLOAD_LONGPOLL_RECHECK_SECONDS", "5"))
+
+    # Export jobs (artifacts on disk, reused for identical selections)
+    EXPORT_FOLDER = os.environ.get("EXPORT_FOLDER", os.path.join(BASE_DIR, "exports"))
+    EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", "2"))       # threads per web process
+    # a running export whose heartbeat is older than this is run again
+    EXPORT_JOB_STALE_SECONDS = int(os.environ.get("EXPORT_JOB_STALE_SECONDS", "60"))
+    EXPORT_MAX_ATTEMPTS = int(os.environ.get("EXPORT_MAX_ATTEMPTS", "3"))
+    EXPORT_RETENTION_HOURS = int(os.environ.get("EXPORT_RETENTION_HOURS", "24"))
+
     # JWT
     JWT_SECRET = os.environ.get("JWT_SECRET", "change-me")
     JWT_ALGORITHM = os.environ.get("JWT_ALGORITHM", "HS256")
     JWT_EXP_DAYS = int(os.environ.get("JWT_EXP_DAYS", "7"))
 
+    # Authenticated-user cache (per process). Admin changes invalidate it in the
+    # process that made them; other workers see them after at most the TTL.
+    AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", "4096"))
+    AUTH_CACHE_TTL = int(os.environ.get("AUTH_CACHE_TTL", "30"))
+
     # Super admin (dev defaults)
     SUPER_ADMIN_EMAIL = os.environ.get("SUPER_ADMIN_EMAIL", "admin@example.com")
     SUPER_ADMIN_PW = os.environ.get("SUPER_ADMIN_PW", "admin123")
\ No newline at end of file
@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, g
 from utils.jwt_utils import jwt_required
-from models import db, Document, SelectedEntry, UploadedFile
+from utils.user_stats import get_user_stats
 
 dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/dashboard")
 
@@ -11,17 +11,11 @@ def dashboard_stats():
 
     uid = g.current_user.id
 
-    # total records extracted from excel
-    total_documents = Document.query.filter_by(user_id=uid).count()
-
-    # selected entries
-    total_selected = SelectedEntry.query.filter_by(user_id=uid).count()
-
-    # number of uploaded files
-    total_uploads = UploadedFile.query.filter_by(user_id=uid).count()
+    # counters maintained on write (utils/user_stats.py): one row read
+    stats = get_user_stats(uid)
 
     return jsonify({
-        "total_data_fetched": total_uploads,
-        "total_entries": total_documents,
-        "total_export": total_selected
+        "total_data_fetched": stats.uploads,
+        "total_entries": stats.documents,
+        "total_export": stats.selected
     })
\ No newline at end of file
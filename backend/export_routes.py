@@ -1,105 +1,91 @@
-from flask import Blueprint, request, jsonify, send_file, g
+import os
+import tempfile
+from flask import Blueprint, request, jsonify, send_file, g, Response, stream_with_context, current_app
 from io import BytesIO
-from openpyxl import Workbook
-from docx import Document as WordDoc
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.shared import Pt
 from models import UploadedFile
-from models import db, Document
+from models import ExportJob
 from utils.jwt_utils import jwt_required
+from utils.export_utils import (
+    parse_ids, iter_export_rows, write_xlsx, write_csv, iter_csv, iter_file,
+    WORD_COLUMNS, XLSX_MIMETYPE, DOCX_MIMETYPE, CSV_MIMETYPE
+)
+from utils.word_export import write_word
+from utils.export_jobs import (
+    EXPORT_FORMATS, submit_export_job, export_job_state, resume_export_job
+)
 import re
 
 export_bp = Blueprint("export", __name__, url_prefix="/export")
 
-# Marathi → English mapping
-DOCNAME_MAP = {
-    "Agreement Relating to Deposit of Title Deeds,Pawn": "Notice of Intimation",
-    "Notice of Intimation": "Notice of Intimation",
-
-    "डिपॉझिट": "Mortgage Deed",
-    "गहाणखत": "Mortgage Deed",
-    "बक्षीसपत्र": "Mortgage Deed",
-    "जामाखत": "Mortgage Deed",
-    "फर्दर चार्ज": "Mortgage Deed",
-    "रीकन्वेअन्स": "Reconveyance",
-    "घोषणापत्र": "Declaration Deed",
-    "हक्कसोड पत्र": "Release Deed",
-    "खरेदीखत": "Sale Deed",
-    "बक्षीसपत्र": "Gift Deed",
-    "भाडेपट्टा": "Lease Deed",
-    "करारनामा": "Agreement",
-    "परिमोचनपत्र":" Relees Deed",
-    "संमती पत्र": "Consent Deed",
-    "लिव्ह अँड लायसेन्स": "Leave and Licence",
-    "सुधार पत्र": "Correction Deed",
-    "ताबा पत्र": "Possession Letter",
-    "मान्यतापत्र":"Consent Deed",
-    "1236-अ-लिव्ह अॅन्ड लायसन्सेस":"Leave and Licence",
-    "वाडवाणी": "Partition Deed",
-    "राखणी नामा": "Partition Deed",
-    "चुक दुरतस्ती":"Correction Deed",
-    "रद्दपत्र": "Cancellation Deed",
-    "अधिकार हस्तांतरणाची विक्री": "Sale Deed",
-    "अभिहस्तांतरणपत्र": "Gift Deed",
-    "अपार्टमेंट डीड":"Deed of Apartment",
-    "डीड ऑफ एक्स्चेंज": "Deed of Exchange",
-    "नोटीस ऑफ लिस पेंडेन्स": "Notice of Lease Pendency",
-}
 
 def clean_filename(name: str) -> str:
     # remove illegal Windows filename characters
     name = name.replace(" ", "_")
     return re.sub(r'[\\/*?:"<>|]', "", name)
 # ====================================================================
-# EXPORT SELECTED → EXCEL
+# EXPORT SELECTED → EXCEL (streamed)
+# Rows are read in id chunks (lean column select) and written through
+# openpyxl write-only mode to a temp file, which is then sent in chunks.
+# "format": "csv" streams straight from the DB cursor instead.
 # ====================================================================
 @export_bp.route("/selected/excel", methods=["POST"])
 @jwt_required
 def export_selected_excel():
     data = request.get_json()
-    ids = [e.get("id") for e in data.get("entries", [])]
+    ids = parse_ids(data.get("entries", []))
+    fmt = (data.get("format") or "xlsx").lower()
 
     if not ids:
         return jsonify({"error": "No entries selected"}), 400
+    if fmt not in ("xlsx", "csv"):
+        return jsonify({"error": "format must be xlsx or csv"}), 400
+
+    uid = g.current_user.id
+
+    if fmt == "csv":
+        return Response(
+            stream_with_context(iter_csv(iter_export_rows(uid, ids))),
+            mimetype=CSV_MIMETYPE,
+            headers={"Content-Disposition": 'attachment; filename="selected_entries.csv"'}
+        )
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx", prefix="export_")
+    os.close(fd)
+    try:
+        write_xlsx(path, iter_export_rows(uid, ids))
+    except Exception:
+        os.remove(path)
+        raise
+
+    return Response(
+        iter_file(path, remove=True),
+        mimetype=XLSX_MIMETYPE,
+        headers={
+            "Content-Disposition": 'attachment; filename="selected_entries.xlsx"',
+            "Content-Length": str(os.path.getsize(path)),
+        }
+    )
 
-    docs = Document.query.filter(
-        Document.id.in_(ids),
-        Document.user_id == g.current_user.id
-    ).all()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.append([
-        "ID", "Doc No", "Doc Name", "Purchaser", "Seller",
-        "Registration Date", "Area", "Consideration"
-    ])
-
-    for d in docs:
-        ws.append([
-            d.id,
-            d.docno,
-            d.docname,
-            d.purchasername,
-            d.sellername,
-            d.registrationdate,
-            d.areaname,
-            d.consideration_amt
-        ])
-
-    stream = BytesIO()
-    wb.save(stream)
-    stream.seek(0)
 
-    return send_file(
-        stream,
-        as_attachment=True,
-        download_name="selected_entries.xlsx",
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+def write_export(fmt, path, uid, ids):
+    """
+    Write one export artifact to `path`. Used by the export job workers.
+    """
+    if fmt == "docx":
+        return write_word(path, iter_export_rows(uid, ids, WORD_COLUMNS))
+    if fmt == "csv":
+        return write_csv(path, iter_export_rows(uid, ids))
+    return write_xlsx(path, iter_export_rows(uid, ids))
+
+
+def export_filename(fmt, table_name=None):
+    if fmt == "docx" and table_name:
+        return clean_filename(f"{table_name}.docx")
+    return f"selected_entries.{fmt}"
 
 
 # ====================================================================
-# EXPORT SELECTED → WORD (Formatted Title + Table)
+# EXPORT SELECTED → WORD
 # ====================================================================
 @export_bp.route("/selected/word", methods=["POST"])
 @jwt_required
@@ -107,7 +93,7 @@ def export_selected_word():
 
     data = request.get_json()
 
-    ids = [e.get("id") for e in data.get("entries", [])]
+    ids = parse_ids(data.get("entries", []))
     table_name = data.get("table_name", "").strip()   # <<< NEW
 
     if not ids:
@@ -122,67 +108,86 @@ def export_selected_word():
     if not uploaded_file:
         return jsonify({"error": "File metadata not found"}), 404
 
-    # ---------- FETCH DOCUMENTS ----------
-    docs = Document.query.filter(
-        Document.id.in_(ids),
-        Document.user_id == g.current_user.id
-    ).all()
+    # ---------- BUILD REPORT (lean rows, chunked fetch) ----------
+    buffer = BytesIO()
+    written = write_word(buffer, iter_export_rows(g.current_user.id, ids, WORD_COLUMNS))
 
-    if not docs:
+    if not written:
         return jsonify({"error": "No matching documents"}), 400
 
-    docx = WordDoc()
+    buffer.seek(0)
+
+    # ---------- CREATE DOWNLOAD FILE NAME ----------
+    filename = export_filename("docx", uploaded_file.table_name)
+
+    response = send_file(
+        buffer,
+        as_attachment=True,
+        download_name=filename,
+        mimetype=DOCX_MIMETYPE
+    )
+
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
 
-    for d in docs:
-        # English doc name conversion
-        eng_docname = DOCNAME_MAP.get(d.docname.strip(), d.docname)
+# ====================================================================
+# EXPORT JOBS (async; artifact kept on disk and reused)
+# POST /export/jobs              {entries, format: xlsx|csv|docx, table_name}
+# GET  /export/jobs/<id>         status
+# GET  /export/jobs/<id>/download
+# ====================================================================
+@export_bp.route("/jobs", methods=["POST"])
+@jwt_required
+def submit_export():
+    data = request.get_json() or {}
+    ids = parse_ids(data.get("entries", []))
+    fmt = (data.get("format") or "xlsx").lower()
+    table_name = (data.get("table_name") or "").strip()
 
-        # Extract year
-        year = ""
-        if d.registrationdate:
-            year = d.registrationdate.split("-")[0]
+    if not ids:
+        return jsonify({"error": "No entries selected"}), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
 
-        # Convert SRO if Marathi
-        sro_eng = ""
-        sro_lower = d.sroname.lower()
-        if "हवेली" in d.sroname or "haveli" in sro_lower:
-            num = "".join([c for c in d.sroname if c.isdigit()])
-            sro_eng = f"HVL {num}"
+    # the Word report is titled from the table's upload, as in /selected/word
+    if fmt == "docx" and not UploadedFile.query.filter_by(
+            table_name=table_name, user_id=g.current_user.id).first():
+        return jsonify({"error": "File metadata not found"}), 404
 
-        title = f"{year} – {eng_docname} dated {d.registrationdate} (Reg. No {sro_eng} {d.docno}/{year})"
+    job, cached = submit_export_job(
+        current_app._get_current_object(), g.current_user.id, ids, fmt, table_name)
 
-        # Title
-        p = docx.add_paragraph(title)
-        p.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        run = p.runs[0]
-        run.bold = True
-        run.font.size = Pt(13)
+    return jsonify({**export_job_state(job), "cached": cached}), 202
 
-        # Table
-        table = docx.add_table(rows=1, cols=3)
-        table.autofit = True
 
-        hdr = table.rows[0].cells
-        hdr[0].text = d.sellername or ""
-        hdr[1].text = d.purchasername or ""
-        hdr[2].text = d.propertydescription or ""
+@export_bp.route("/jobs/<int:job_id>", methods=["GET"])
+@jwt_required
+def export_status(job_id):
+    job = ExportJob.query.get(job_id)
 
-        docx.add_paragraph("\n")
+    if not job or job.user_id != g.current_user.id:
+        return jsonify({"error": "Job not found"}), 404
 
-    buffer = BytesIO()
-    docx.save(buffer)
-    buffer.seek(0)
+    resume_export_job(current_app._get_current_object(), job)
+    return jsonify(export_job_state(job))
 
-    # ---------- CREATE DOWNLOAD FILE NAME ----------
-    filename = f"{uploaded_file.table_name}.docx"
-    filename = clean_filename(filename)
 
-    response = send_file(
-        buffer,
+@export_bp.route("/jobs/<int:job_id>/download", methods=["GET"])
+@jwt_required
+def export_download(job_id):
+    job = ExportJob.query.get(job_id)
+
+    if not job or job.user_id != g.current_user.id:
+        return jsonify({"error": "Job not found"}), 404
+    if job.status != "done":
+        return jsonify({"error": f"Export is {job.status}"}), 409
+    if not job.artifact_path or not os.path.exists(job.artifact_path):
+        return jsonify({"error": "Export file expired, submit it again"}), 410
+
+    return send_file(
+        job.artifact_path,
         as_attachment=True,
-        download_name=filename,
-        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        download_name=job.filename,
+        mimetype=EXPORT_FORMATS[job.format]
     )
-
-    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return response
\ No newline at end of file
@@ -1,9 +1,18 @@
 import os
+import codecs
 import pandas as pd
 import json
 import xlrd
-from datetime import datetime
+from datetime import date, datetime
 from bs4 import BeautifulSoup
+from openpyxl import load_workbook
+
+from utils.helper_utils import safe_float
+
+try:
+    from lxml import etree
+except ImportError:  # fall back to the BeautifulSoup reader
+    etree = None
 
 # =========================================================
 # COLUMN MAP (canonical column names for DB)
@@ -73,22 +82,37 @@ def normalize_colname(name: str):
     return " ".join(n.split())
 
 
-def map_dataframe_columns(df: pd.DataFrame):
+def canonical_column(name):
+    nc = normalize_colname(name)
+    if nc in COLUMN_MAP:
+        return COLUMN_MAP[nc]
+    clean = nc.replace(" ", "").replace("_", "")
+    return COLUMN_MAP.get(clean)
+
+
+def map_header(headers):
+    """
+    Map a header row once per sheet: {column index: canonical name}.
+    """
     col_map = {}
-    for c in df.columns:
-        nc = normalize_colname(c)
-        if nc in COLUMN_MAP:
-            col_map[c] = COLUMN_MAP[nc]
-        else:
-            clean = nc.replace(" ", "").replace("_", "")
-            col_map[c] = COLUMN_MAP.get(clean)
+    for idx, h in enumerate(headers):
+        canon = canonical_column(h)
+        if canon:
+            col_map[idx] = canon
     return col_map
 
 
+def map_dataframe_columns(df: pd.DataFrame):
+    return {c: canonical_column(c) for c in df.columns}
+
+
 # =========================================================
 # DATE NORMALIZATION
 # All dates stored as YYYY-MM-DD for DB
 # =========================================================
+DATE_FORMATS = ["%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d-%m-%y"]
+
+
 def normalize_date(val):
     if not val:
         return None
@@ -104,8 +128,7 @@ def normalize_date(val):
         pass
 
     # Try many formats
-    formats = ["%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d-%m-%y"]
-    for f in formats:
+    for f in DATE_FORMATS:
         try:
             return datetime.strptime(val, f).strftime("%Y-%m-%d")
         except:
@@ -114,6 +137,144 @@ def normalize_date(val):
     return val
 
 
+DATE_COLUMNS = ("registrationdate", "dateofexecution")
+AMOUNT_COLUMNS = ("consideration_amt", "marketvalue")
+
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+EXCEL_MAX_DAYS = 2958465        # 9999-12-31, datetime's upper bound
+
+
+DATE_CACHE_MAX = 100_000
+
+
+def normalize_date_column(values, cache=None):
+    """
+    Columnar normalize_date: same result for every value, but each distinct
+    value is parsed once, and the Excel-serial / strptime formats run as
+    vectorized pandas conversions over the distinct values of the column.
+
+    `cache` (value → normalized) may be shared across batches of one file;
+    registry exports repeat the same few thousand dates over and over.
+    """
+    if cache is None or len(cache) > DATE_CACHE_MAX:
+        cache = {} if cache is None else cache
+        cache.clear()
+
+    todo = []
+    for v in set(values):
+        if v in cache:
+            continue
+        if not v:
+            cache[v] = None
+        else:
+            todo.append(v)
+
+    if todo:
+        raw = pd.Series(todo, dtype=object)
+        s = raw.astype(str).str.strip()
+        resolved = pd.Series(index=s.index, dtype=object)
+
+        # Excel serial numbers ("43831" / "43831.0")
+        numeric = s.str.fullmatch(r"[0-9.]*[0-9][0-9.]*")
+        days = pd.to_numeric(s[numeric], errors="coerce")
+        days = days[days.notna() & (days <= EXCEL_MAX_DAYS)].astype("int64")
+        if len(days):
+            resolved[days.index] = (EXCEL_EPOCH + pd.to_timedelta(days, unit="D")).dt.strftime("%Y-%m-%d")
+
+        # explicit formats, first match wins (as in normalize_date)
+        for f in DATE_FORMATS:
+            rest = s[resolved.isna()]
+            if rest.empty:
+                break
+            parsed = pd.to_datetime(rest, format=f, errors="coerce")
+            parsed = parsed[parsed.notna()]
+            if len(parsed):
+                resolved[parsed.index] = parsed.dt.strftime("%Y-%m-%d")
+
+        for i, v in enumerate(todo):
+            out = resolved.iat[i]
+            # leftovers (free text, non-ASCII digits) keep the scalar behaviour
+            cache[v] = out if isinstance(out, str) else normalize_date(v)
+
+    return [cache[v] for v in values]
+
+
+def parse_amount_column(values):
+    """
+    Columnar safe_float: '1,20,000' → 120000.0, blanks / junk → None.
+    to_numeric only reads ASCII digits, so what it rejects goes through
+    safe_float (float() also takes Devanagari digits: '१,२०,०००').
+    """
+    s = pd.Series(values, dtype=object).astype(str).str.replace(",", "", regex=False).str.strip()
+    nums = pd.to_numeric(s.mask(s.isin(["", "None"])), errors="coerce")
+    return [safe_float(v) if pd.isna(x) else float(x) for v, x in zip(values, nums)]
+
+
+def normalize_batch(batch, date_cache=None):
+    """
+    Normalize a batch of raw parsed rows column by column (in place).
+    """
+    for col in DATE_COLUMNS:
+        values = normalize_date_column([r.get(col) for r in batch], date_cache)
+        for r, v in zip(batch, values):
+            r[col] = v
+
+    for col in AMOUNT_COLUMNS:
+        values = parse_amount_column([r.get(col) for r in batch])
+        for r, v in zip(batch, values):
+            r[col] = v
+
+    return batch
+
+
+def iso_date(value):
+    """
+    datetime.date for a normalized 'YYYY-MM-DD' string; None for blanks and
+    text normalize_date could not parse.
+    """
+    if not value or len(value) != 10 or value[4] != "-":
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def registration_year(value):
+    """
+    Year of a normalized 'YYYY-MM-DD' date, or None for unparsed text.
+    """
+    d = iso_date(value)
+    return d.year if d else None
+
+
+# =========================================================
+# NATURAL DOCUMENT KEY
+# The same deed shows up in many monthly exports; it is identified
+# by (sroname, docno, registration year), normalized.
+# =========================================================
+def _key_part(val):
+    if val is None:
+        return ""
+    return " ".join(str(val).lower().split())
+
+
+def natural_key(rec):
+    """
+    'sro|docno|year' for a normalized row, or None when a part is missing.
+    """
+    sro = _key_part(rec.get("sroname"))
+    docno = _key_part(rec.get("docno"))
+    if docno.endswith(".0"):
+        docno = docno[:-2]          # numeric .xls cells come back as "1234.0"
+    docno = docno.lstrip("0") or docno
+    year = str(rec.get("registrationdate") or "")[:4]
+
+    if not sro or not docno or not year.isdigit():
+        return None
+    return f"{sro}|{docno}|{year}"
+
+
 # =========================================================
 # DETECT HTML DISGUISED XLS
 # =========================================================
@@ -129,10 +290,86 @@ def is_html_disguised_xls(path):
 
 
 # =========================================================
-# PARSE HTML TABLES (UTF-16 or UTF-8)
+# HTML TABLE READERS (yield each <tr> as a list of cell texts)
 # =========================================================
-def parse_html_xls(path):
-    # Most government files are UTF-16
+HTML_READ_CHUNK = 256 * 1024
+
+
+def sniff_html_encoding(path):
+    # Most government files are UTF-16 (usually with a BOM)
+    with open(path, "rb") as f:
+        start = f.read(4)
+
+    if start.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return "utf-16"
+    if len(start) >= 2 and start[1:2] == b"\x00":
+        return "utf-16-le"
+    return "utf-8"
+
+
+def iter_html_table_rows(path):
+    """
+    Incremental reader: decodes the file chunk by chunk and lets lxml's pull
+    parser emit each finished <tr> of the first <table>, which is then freed.
+    Memory stays flat whatever the file size.
+    """
+    encoding = sniff_html_encoding(path)
+    decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+    parser = etree.HTMLPullParser(events=("start", "end"), tag=("table", "tr"))
+
+    first_table = None
+    depth = 0
+
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HTML_READ_CHUNK)
+            final = not chunk
+            parser.feed(decoder.decode(chunk, final=final))
+
+            for event, el in parser.read_events():
+                if el.tag == "table":
+                    if event == "start":
+                        if first_table is None:
+                            first_table = el
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if el is first_table:
+                            return
+                    continue
+
+                # <tr> end: only rows directly owned by the first table
+                if event != "end" or depth != 1 or first_table is None:
+                    continue
+
+                cells = []
+                for td in el:
+                    if td.tag != "td" and td.tag != "th":
+                        continue
+                    if len(td):
+                        # nested markup (<b>, <br>, <span>): same as get_text(strip=True)
+                        cells.append("".join(t.strip() for t in td.itertext()))
+                    else:
+                        cells.append((td.text or "").strip())
+                yield cells
+
+                # drop the finished row and everything before it
+                el.clear()
+                parent = el.getparent()
+                while el.getprevious() is not None:
+                    del parent[0]
+
+            if final:
+                break
+
+    parser.close()
+
+
+def iter_html_table_rows_soup(path):
+    """
+    Original BeautifulSoup reader (whole file + full tree in memory).
+    Used when lxml is unavailable; kept for benchmarks/bench_html_xls.py.
+    """
     try:
         with open(path, "r", encoding="utf-16") as f:
             html = f.read()
@@ -143,30 +380,33 @@ def parse_html_xls(path):
     soup = BeautifulSoup(html, "html.parser")
     table = soup.find("table")
     if not table:
-        return []
+        return
 
-    rows = []
-    trs = table.find_all("tr")
+    for tr in table.find_all("tr"):
+        yield [td.get_text(strip=True) for td in tr.find_all(["td", "th"])]
 
-    # Header
-    header_cells = trs[0].find_all(["td", "th"])
-    headers = [normalize_colname(th.get_text(strip=True)) for th in header_cells]
 
-    col_map = {}
-    for idx, h in enumerate(headers):
-        if h in COLUMN_MAP:
-            col_map[idx] = COLUMN_MAP[h]
-        else:
-            clean = h.replace(" ", "").replace("_", "")
-            col_map[idx] = COLUMN_MAP.get(clean)
+# =========================================================
+# PARSE HTML TABLES (UTF-16 or UTF-8)
+# =========================================================
+def parse_html_xls(path, row_reader=None):
+    if row_reader is None:
+        row_reader = iter_html_table_rows if etree is not None else iter_html_table_rows_soup
+
+    trs = row_reader(path)
+
+    # Header
+    header_cells = next(trs, None)
+    if header_cells is None:
+        return
+    headers = [normalize_colname(c) for c in header_cells]
+    col_map = map_header(headers)
 
     # Body rows
-    for tr in trs[1:]:
-        tds = tr.find_all(["td", "th"])
+    for cells in trs:
         rec, raw = {}, {}
 
-        for i, td in enumerate(tds):
-            value = td.get_text(strip=True)
+        for i, value in enumerate(cells):
             key = headers[i] if i < len(headers) else f"col{i}"
 
             raw[key] = value
@@ -175,33 +415,21 @@ def parse_html_xls(path):
             if canon:
                 rec[canon] = value
 
-        rec["registrationdate"] = normalize_date(rec.get("registrationdate"))
-        rec["dateofexecution"] = normalize_date(rec.get("dateofexecution"))
         rec["raw_json"] = json.dumps(raw, ensure_ascii=False)
 
-        rows.append(rec)
-
-    return rows
+        yield rec
 
 
 # =========================================================
 # PARSE REAL .XLS (xlrd)
 # =========================================================
 def parse_xls_manual(path):
-    book = xlrd.open_workbook(path)
-    all_rows = []
-
-    for sheet in book.sheets():
-        header = [normalize_colname(str(c)) for c in sheet.row_values(0)]
-        raw_header = sheet.row_values(0)
+    book = xlrd.open_workbook(path, on_demand=True)
 
-        col_map = {}
-        for idx, h in enumerate(header):
-            if h in COLUMN_MAP:
-                col_map[idx] = COLUMN_MAP[h]
-            else:
-                clean = h.replace(" ", "").replace("_", "")
-                col_map[idx] = COLUMN_MAP.get(clean)
+    for sheet_name in book.sheet_names():
+        sheet = book.sheet_by_name(sheet_name)
+        raw_header = [str(c) for c in sheet.row_values(0)]
+        col_map = map_header(raw_header)
 
         for r in range(1, sheet.nrows):
             row = sheet.row_values(r)
@@ -209,59 +437,76 @@ def parse_xls_manual(path):
 
             for col_index, value in enumerate(row):
                 val = str(value).strip()
-                raw_row[str(raw_header[col_index])] = val
+                raw_row[raw_header[col_index]] = val
                 canon = col_map.get(col_index)
                 if canon:
                     rec[canon] = val
 
-            rec["registrationdate"] = normalize_date(rec.get("registrationdate"))
-            rec["dateofexecution"] = normalize_date(rec.get("dateofexecution"))
             rec["raw_json"] = json.dumps(raw_row, ensure_ascii=False)
 
-            all_rows.append(rec)
+            yield rec
 
-    return all_rows
+        book.unload_sheet(sheet_name)
 
 
 # =========================================================
-# PARSE .XLSX (pandas)
+# PARSE .XLSX (openpyxl read-only, streams rows from the zip)
 # =========================================================
+def xlsx_cell_str(val):
+    if val is None:
+        return ""
+    # same as pandas: whole floats come back as ints ("1200", not "1200.0")
+    if isinstance(val, float) and val.is_integer():
+        val = int(val)
+    return str(val).strip()
+
+
 def parse_xlsx(path):
-    xls = pd.ExcelFile(path, engine="openpyxl")
-    all_rows = []
+    wb = load_workbook(path, read_only=True, data_only=True)
 
-    for sheet in xls.sheet_names:
-        df = xls.parse(sheet, dtype=str)
-        df = df.fillna("")
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
 
-        col_map = map_dataframe_columns(df)
+            header_row = next(rows, None)
+            if header_row is None:
+                continue
 
-        records = df.to_dict(orient="records")  # 🚀 FAST
+            columns = [
+                xlsx_cell_str(c) or f"Unnamed: {i}"
+                for i, c in enumerate(header_row)
+            ]
 
-        for row in records:
-            rec, raw = {}, {}
+            col_map = map_header(columns)
 
-            for col, val in row.items():
-                val = str(val).strip()
-                raw[col] = val
-                canon = col_map.get(col)
-                if canon:
-                    rec[canon] = val
+            for values in rows:
+                # skip fully empty rows (pandas did the same)
+                if all(v is None or v == "" for v in values):
+                    continue
 
-            rec["registrationdate"] = normalize_date(rec.get("registrationdate"))
-            rec["dateofexecution"] = normalize_date(rec.get("dateofexecution"))
-            rec["raw_json"] = json.dumps(raw, ensure_ascii=False)
+                rec, raw = {}, {}
 
-            all_rows.append(rec)
+                for idx, col in enumerate(columns):
+                    val = xlsx_cell_str(values[idx]) if idx < len(values) else ""
+                    raw[col] = val
+                    canon = col_map.get(idx)
+                    if canon:
+                        rec[canon] = val
 
-    return all_rows
+                rec["raw_json"] = json.dumps(raw, ensure_ascii=False)
+
+                yield rec
+    finally:
+        wb.close()
 
 
 
 # =========================================================
 # MAIN ENTRY
+# Every parser is a generator of raw rows; dates and amounts are
+# normalized per batch, column by column (normalize_batch)
 # =========================================================
-def extract_rows_from_excel(path):
+def iter_raw_rows(path):
     ext = os.path.splitext(path)[1].lower()
 
     if ext == ".xls":
@@ -276,3 +521,24 @@ def extract_rows_from_excel(path):
         return parse_xlsx(path)
 
     raise ValueError("Unsupported file format. Upload .xls or .xlsx")
+
+
+
+# =========================================================
+# FIXED-SIZE BATCHES (bounded memory for the DB writer)
+# =========================================================
+def iter_row_batches(path, batch_size=2000):
+    batch = []
+    date_cache = {}
+    for rec in iter_raw_rows(path):
+        batch.append(rec)
+        if len(batch) >= batch_size:
+            yield normalize_batch(batch, date_cache)
+            batch = []
+    if batch:
+        yield normalize_batch(batch, date_cache)
+
+
+def extract_rows_from_excel(path):
+    for batch in iter_row_batches(path):
+        yield from batch
@@ -1,14 +1,24 @@
+import io
 import os
-from threading import Thread
+import time
+from datetime import datetime
+
+import queue
 
 from flask import Blueprint, request, jsonify, g, current_app
 from werkzeug.utils import secure_filename
-from sqlalchemy import text
+from sqlalchemy import text, select, update, bindparam
 
 from models import db, UploadedFile, Document, UploadJob
-from extractor import extract_rows_from_excel
+from extractor import natural_key, registration_year, iso_date
+from utils.parse_pool import iter_parsed_batches
 from utils.jwt_utils import jwt_required
-from utils.helper_utils import allowed_file, safe_float
+from utils.helper_utils import allowed_file, save_with_hash
+from utils.search_cache import bump_data_version
+from utils.user_stats import add_user_stats
+from utils.job_queue import enqueue_upload_job, check_claim, JobClaimLost
+from utils.events import job_events, upload_job_state
+from utils.name_keys import index_party_names, index_file_party_names, remove_file_party_names
 
 file_bp = Blueprint("file", __name__, url_prefix="/upload")
 
@@ -16,66 +26,423 @@ file_bp = Blueprint("file", __name__, url_prefix="/upload")
 # ======================================================
 # BACKGROUND FILE PROCESSOR
 # ======================================================
-def process_files_background(app, saved_paths, table_name, uid, job_id):
+def row_to_mapping(r, uid, file_id, table_name):
+    return {
+        "user_id": uid,
+        "file_id": file_id,
+        "table_name": table_name,
+        "docno": r.get("docno"),
+        "docname": r.get("docname"),
+        "registrationdate": r.get("registrationdate"),
+        "registration_date": iso_date(r.get("registrationdate")),
+        "registration_year": registration_year(r.get("registrationdate")),
+        "dateofexecution": r.get("dateofexecution"),
+        "execution_date": iso_date(r.get("dateofexecution")),
+        "purchasername": r.get("purchasername"),
+        "sellername": r.get("sellername"),
+        "propertydescription": r.get("propertydescription"),
+        "areaname": r.get("areaname"),
+        "sroname": r.get("sroname"),
+        # already floats: amounts are parsed per batch (extractor.normalize_batch)
+        "consideration_amt": r.get("consideration_amt"),
+        "marketvalue": r.get("marketvalue"),
+        "raw_json": r.get("raw_json")
+    }
+
+
+DEDUPE_MODES = ("off", "skip", "update")
+
+# refreshed when an "update" upload meets a deed it already has; the key
+# parts and ownership (file, table) stay with the first copy
+UPSERT_COLUMNS = (
+    "docname", "registrationdate", "registration_date", "registration_year",
+    "dateofexecution", "execution_date", "purchasername",
+    "sellername", "propertydescription", "areaname",
+    "consideration_amt", "marketvalue", "raw_json",
+)
+
+
+def existing_natural_keys(uid, keys, chunk_size=500):
+    found = set()
+    keys = list(keys)
+    for i in range(0, len(keys), chunk_size):
+        found.update(db.session.execute(
+            select(Document.natural_key).where(
+                Document.user_id == uid,
+                Document.natural_key.in_(keys[i:i + chunk_size])
+            )
+        ).scalars())
+    return found
+
+
+# pg_advisory_xact_lock(namespace, user id) of the dedupe writers
+NATURAL_KEY_LOCK = 11
+
+
+def lock_natural_keys(uid):
+    """
+    Serialize one user's dedupe writers until the end of the transaction, so
+    the existing-key lookup and the insert of another job can't interleave
+    (natural_key is not unique: "off" uploads keep repeated deeds).
+    """
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        db.session.execute(text("SELECT pg_advisory_xact_lock(:ns, :uid)"),
+                           {"ns": NATURAL_KEY_LOCK, "uid": uid})
+    elif dialect == "sqlite":
+        # any write statement takes SQLite's single write lock until commit
+        db.session.execute(text("UPDATE documents SET id = id WHERE 0 = 1"))
+
+
+def copy_escape(value):
+    """
+    One field in COPY text format: \\N for NULL, backslash escapes for the
+    delimiter and line breaks.
+    """
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
 
-    with app.app_context():
 
-        job = UploadJob.query.get(job_id)
+def insert_documents(rows):
+    """
+    Plain append of mapped rows. On PostgreSQL one COPY ... FROM STDIN
+    (no per-row INSERT parsing, no bind parameters); elsewhere an
+    executemany INSERT.
+    """
+    if not rows:
+        return
+    if db.engine.dialect.name != "postgresql":
+        db.session.bulk_insert_mappings(Document, rows)
+        return
+
+    cols = list(rows[0])
+    buf = io.StringIO()
+    for r in rows:
+        buf.write("\t".join(copy_escape(r.get(c)) for c in cols))
+        buf.write("\n")
+    buf.seek(0)
+
+    sql = f"COPY documents ({', '.join(cols)}) FROM STDIN"
+    # same connection / transaction as the session
+    cur = db.session.connection().connection.cursor()
+    try:
+        if hasattr(cur, "copy_expert"):      # psycopg2
+            cur.copy_expert(sql, buf)
+        else:                                # psycopg 3
+            with cur.copy(sql) as copy:
+                copy.write(buf.getvalue())
+    finally:
+        cur.close()
+
+
+def write_batch(docs, uid, mode):
+    """
+    Write one batch of mapped rows. mode "off" appends everything; "skip"
+    and "update" keep one row per natural key and user. Every row stores
+    its natural key, so a later dedupe upload matches it whatever the mode.
+    Returns (inserted, updated, skipped).
+    """
+    for d in docs:
+        d["natural_key"] = natural_key(d)
+
+    if mode not in ("skip", "update"):
+        insert_documents(docs)
+        return len(docs), 0, 0
+
+    lock_natural_keys(uid)
+
+    unkeyed, keyed = [], {}
+    repeats = 0
+    for d in docs:
+        key = d["natural_key"]
+        if key is None:
+            unkeyed.append(d)
+            continue
+        if key in keyed:
+            # repeated inside this batch: first copy wins for skip, last for update
+            repeats += 1
+            if mode == "skip":
+                continue
+        keyed[key] = d
+
+    existing = existing_natural_keys(uid, keyed)
+    new_rows = [d for k, d in keyed.items() if k not in existing]
+    old_rows = [d for k, d in keyed.items() if k in existing]
+
+    if unkeyed:
+        insert_documents(unkeyed)
+    if new_rows:
+        insert_documents(new_rows)
+
+    inserted = len(unkeyed) + len(new_rows)
+    if mode == "skip":
+        return inserted, 0, len(old_rows) + repeats
+
+    if old_rows:
+        t = Document.__table__
+        stmt = (
+            update(t)
+            .where(t.c.user_id == bindparam("key_uid"), t.c.natural_key == bindparam("key"))
+            .values({c: bindparam(c) for c in UPSERT_COLUMNS})
+        )
+        db.session.execute(stmt, [
+            {**{c: d[c] for c in UPSERT_COLUMNS}, "key_uid": uid, "key": d["natural_key"]}
+            for d in old_rows
+        ])
+        # names may have changed
+        keys = [d["natural_key"] for d in old_rows]
+        for i in range(0, len(keys), 500):
+            index_party_names(
+                [t.c.user_id == uid, t.c.natural_key.in_(keys[i:i + 500])], replace=True)
+    return inserted, len(old_rows) + repeats, 0
+
+
+def discard_file_rows(file_id, job, uid, claim=None):
+    """
+    Remove everything a failed file already committed, plus its metadata row.
+    """
+    remove_file_party_names(file_id)
+    removed = Document.query.filter_by(file_id=file_id).delete(
+        synchronize_session=False)
+    files = UploadedFile.query.filter_by(id=file_id).delete(
+        synchronize_session=False)
+    add_user_stats(uid, documents=-removed, uploads=-files)
+    job.processed_rows = max((job.processed_rows or 0) - removed, 0)
+    job.rows_inserted = max((job.rows_inserted or 0) - removed, 0)
+    bump_data_version(uid)
+    check_claim(job.id, claim)
+    db.session.commit()
 
-        for fpath in saved_paths:
 
-            try:
+def find_ingested_copy(uid, content_hash, job_id):
+    """
+    A finished earlier upload of the same bytes by this user, if any.
+    Only uploads ingested with dedupe "off" qualify: a skip / update upload
+    owns just the deeds it inserted (repeats stay with older files), so its
+    rows are not the whole file.
+    """
+    if not content_hash:
+        return None
+    return (
+        UploadedFile.query
+        .outerjoin(UploadJob, UploadedFile.job_id == UploadJob.id)
+        .filter(
+            UploadedFile.user_id == uid,
+            UploadedFile.content_hash == content_hash,
+            db.or_(UploadedFile.job_id.is_(None), UploadJob.status == "done"),
+            db.or_(UploadedFile.job_id.is_(None), UploadedFile.job_id != job_id),
+            db.or_(UploadedFile.job_id.is_(None), db.func.coalesce(UploadJob.dedupe_mode, "off") == "off"),
+        )
+        .order_by(UploadedFile.id.desc())
+        .first()
+    )
 
-                fname = os.path.basename(fpath)
-
-                # save metadata
-                uf = UploadedFile(
-                    user_id=uid,
-                    filename=fname,
-                    filepath=fpath,
-                    filesize=os.path.getsize(fpath),
-                    table_name=table_name
-                )
-                db.session.add(uf)
-                db.session.flush()
-
-                # 🔥 NOW PARSER WILL WORK
-                rows = extract_rows_from_excel(fpath)
-
-                docs = []
-                for r in rows:
-                    docs.append({
-                        "user_id": uid,
-                        "file_id": uf.id,
-                        "table_name": table_name,
-                        "docno": r.get("docno"),
-                        "docname": r.get("docname"),
-                        "registrationdate": r.get("registrationdate"),
-                        "dateofexecution": r.get("dateofexecution"),
-                        "purchasername": r.get("purchasername"),
-                        "sellername": r.get("sellername"),
-                        "propertydescription": r.get("propertydescription"),
-                        "areaname": r.get("areaname"),
-                        "sroname": r.get("sroname"),
-                        "consideration_amt": safe_float(r.get("consideration_amt")),
-                        "marketvalue": safe_float(r.get("marketvalue")),
-                        "raw_json": r.get("raw_json")
-                    })
 
-                if docs:
-                    db.session.bulk_insert_mappings(Document, docs)
+def copy_file_rows(source_file_id, file_id, table_name, dedupe_mode="off"):
+    """
+    Link a re-uploaded file into another table by copying its parsed rows
+    (INSERT ... SELECT, no parsing). Returns (rows copied, rows skipped).
+
+    The source is a dedupe "off" upload (find_ingested_copy), so it owns
+    every row of the file. With dedupe on, its keyed rows are already this
+    user's deeds, so only the unkeyed ones are copied.
+    """
+    cols = [
+        c.name for c in Document.__table__.columns
+        if c.name not in ("id", "file_id", "table_name")
+    ]
+    col_sql = ", ".join(cols)
+    params = {"file_id": file_id, "table_name": table_name, "source_file_id": source_file_id}
+
+    keyed_filter = ""
+    skipped = 0
+    if dedupe_mode in ("skip", "update"):
+        keyed_filter = "AND natural_key IS NULL"
+        skipped = db.session.execute(text("""
+            SELECT COUNT(*) FROM documents
+            WHERE file_id = :source_file_id AND natural_key IS NOT NULL
+        """), params).scalar()
+
+    result = db.session.execute(text(f"""
+        INSERT INTO documents (file_id, table_name, {col_sql})
+        SELECT :file_id, :table_name, {col_sql}
+        FROM documents
+        WHERE file_id = :source_file_id {keyed_filter}
+        ORDER BY id
+    """), params)
+    index_file_party_names(file_id)
+    return result.rowcount, skipped
+
+
+def commit_and_publish(job, claim=None):
+    """
+    Commit (if `claim` still owns the job), then push the job's new state to
+    long-poll waiters in this process.
+    """
+    state = upload_job_state(job)     # read before commit expires the attributes
+    check_claim(job.id, claim)
+    db.session.commit()
+    job_events.publish(job.id, "progress", state)
+
 
-                db.session.commit()
+def process_files_background(app, saved_paths, table_name, uid, job_id, content_hashes=None, claim=None):
+    """
+    Ingest one upload job. `claim` is the (claimed_by, attempts) the queue
+    worker claimed it with: every commit first checks it still holds, so a
+    job requeued as stale is never written by two workers (JobClaimLost).
+    """
 
-            except Exception as e:
-                print("UPLOAD ERROR:", e)  # <-- ADD THIS (IMPORTANT)
-                db.session.rollback()
+    with app.app_context():
 
+        job = UploadJob.query.get(job_id)
+        batch_size = app.config.get("INGEST_BATCH_SIZE", 2000)
+        workers = app.config.get("INGEST_PARSE_WORKERS", 1)
+        dedupe_mode = job.dedupe_mode or "off"
+
+        # retry after a crash: drop whatever the previous attempt committed
+        for (old_file_id,) in db.session.query(UploadedFile.id).filter_by(job_id=job_id).all():
+            discard_file_rows(old_file_id, job, uid, claim)
+        job.processed_files = 0
+        job.processed_rows = 0
+        job.duplicate_files = 0
+        job.rows_inserted = 0
+        job.rows_updated = 0
+        job.rows_skipped = 0
+        check_claim(job_id, claim)
+        db.session.commit()
+
+        content_hashes = content_hashes or [None] * len(saved_paths)
+
+        # save metadata up front so every parsed batch knows its file_id;
+        # files whose bytes were already ingested are not parsed again
+        file_ids = []
+        parse_paths = []
+        parse_index = []      # position of each parsed file in saved_paths
+        seen_hashes = set()
+        for pos, (fpath, chash) in enumerate(zip(saved_paths, content_hashes)):
+            source = find_ingested_copy(uid, chash, job_id)
+
+            if chash in seen_hashes or (source and source.table_name == table_name):
+                # same bytes, same table: nothing new to ingest
+                if source and os.path.abspath(source.filepath) != os.path.abspath(fpath):
+                    try:
+                        os.remove(fpath)
+                    except OSError:
+                        pass
+                job.duplicate_files = (job.duplicate_files or 0) + 1
+                job.processed_files += 1
+                continue
+
+            if chash:
+                seen_hashes.add(chash)
+
+            uf = UploadedFile(
+                user_id=uid,
+                filename=os.path.basename(fpath),
+                filepath=fpath,
+                filesize=os.path.getsize(fpath),
+                table_name=table_name,
+                job_id=job_id,
+                content_hash=chash
+            )
+            db.session.add(uf)
+            db.session.flush()
+
+            if source:
+                # same bytes under another table name: link its parsed rows
+                copied, skipped = copy_file_rows(source.id, uf.id, table_name, dedupe_mode)
+                job.duplicate_files = (job.duplicate_files or 0) + 1
+                job.processed_rows = (job.processed_rows or 0) + copied + skipped
+                job.rows_inserted = (job.rows_inserted or 0) + copied
+                job.rows_skipped = (job.rows_skipped or 0) + skipped
+                job.processed_files += 1
+                add_user_stats(uid, documents=copied, uploads=1)
+                if copied:
+                    bump_data_version(uid)
+                check_claim(job_id, claim)
+                db.session.commit()
+                continue
+
+            add_user_stats(uid, uploads=1)
+            file_ids.append(uf.id)
+            parse_paths.append(fpath)
+            parse_index.append(pos)
+        commit_and_publish(job, claim)
+
+        failed = set()
+        indexed_upto = {}     # file_id -> last document id with name keys
+
+        # 🔥 parsers (inline or process pool) stream batches to this single writer
+        idle = app.config.get("INGEST_PARSE_IDLE_SECONDS", 300)
+        for kind, idx, payload in iter_parsed_batches(parse_paths, batch_size, workers, idle):
+            file_id = file_ids[idx]
+
+            if kind == "rows":
+                if idx in failed:
+                    continue
+                try:
+                    docs = [row_to_mapping(r, uid, file_id, table_name) for r in payload]
+
+                    inserted, updated, skipped = write_batch(docs, uid, dedupe_mode)
+
+                    # name keys for the rows this batch added (ids are only known now)
+                    t = Document.__table__
+                    _, last_id = index_party_names([
+                        t.c.user_id == uid, t.c.table_name == table_name,
+                        t.c.id > indexed_upto.get(file_id, 0), t.c.file_id == file_id,
+                    ])
+                    if last_id is not None:
+                        indexed_upto[file_id] = last_id
+
+                    job.processed_rows = (job.processed_rows or 0) + len(docs)
+                    job.rows_inserted = (job.rows_inserted or 0) + inserted
+                    job.rows_updated = (job.rows_updated or 0) + updated
+                    job.rows_skipped = (job.rows_skipped or 0) + skipped
+                    job.heartbeat_at = datetime.utcnow()
+                    add_user_stats(uid, documents=inserted)
+                    bump_data_version(uid)
+                    commit_and_publish(job, claim)
+                except JobClaimLost:
+                    raise
+                except Exception as e:
+                    app.logger.exception(f"Upload job {job_id}: batch of {parse_paths[idx]} failed")
+                    db.session.rollback()
+                    failed.add(idx)
+                    job_events.publish(job_id, "file_error", {
+                        "file": parse_index[idx],
+                        "name": os.path.basename(parse_paths[idx]),
+                        "error": str(e)
+                    })
+                continue
+
+            if kind == "error":
+                app.logger.error(f"Upload job {job_id}: parsing {parse_paths[idx]} failed: {payload}")
+                failed.add(idx)
+                job_events.publish(job_id, "file_error", {
+                    "file": parse_index[idx],
+                    "name": os.path.basename(parse_paths[idx]),
+                    "error": payload
+                })
+
+            # a failed file leaves nothing behind (earlier batches were committed)
+            if idx in failed:
+                discard_file_rows(file_id, job, uid, claim)
+
+            # committed now: a failing batch of the next file rolls back
             job.processed_files += 1
-            db.session.commit()
+            job.heartbeat_at = datetime.utcnow()
+            commit_and_publish(job, claim)
 
         job.status = "done"
-        db.session.commit()
+        job.finished_at = datetime.utcnow()
+        commit_and_publish(job, claim)
 
 
 # ======================================================
@@ -87,9 +454,12 @@ def upload_files():
 
     files = request.files.getlist("files")
     table_name = request.form.get("table_name", "").strip()
+    dedupe_mode = request.form.get("dedupe", current_app.config["INGEST_DEDUPE_MODE"]).strip().lower()
 
     if not table_name:
         return jsonify({"error": "Table name is required"}), 400
+    if dedupe_mode not in DEDUPE_MODES:
+        return jsonify({"error": f"dedupe must be one of {', '.join(DEDUPE_MODES)}"}), 400
     if not files:
         return jsonify({"error": "No files uploaded"}), 400
 
@@ -100,36 +470,27 @@ def upload_files():
     os.makedirs(table_folder, exist_ok=True)
 
     saved_paths = []
+    content_hashes = []
 
-    # 🔴 SAVE FILES HERE (NOT IN THREAD)
+    # 🔴 SAVE FILES HERE (NOT IN THREAD), hashing the bytes as they are written
     for file in files:
         fname = secure_filename(file.filename)
         fpath = os.path.join(table_folder, fname)
-        file.save(fpath)
+        content_hashes.append(save_with_hash(file, fpath))
         saved_paths.append(fpath)
 
-    # create job
-    job = UploadJob(
-        user_id=uid,
-        table_name=table_name,
-        total_files=len(saved_paths),
-        processed_files=0,
-        status="processing"
-    )
-    db.session.add(job)
-    db.session.commit()
-
-    app = current_app._get_current_object()
-
-    Thread(
-        target=process_files_background,
-        args=(app, saved_paths, table_name, uid, job.id),
-        daemon=True
-    ).start()
+    # queue the job; a bounded worker pool picks it up (survives restarts)
+    job = enqueue_upload_job(uid, table_name, saved_paths, content_hashes, dedupe_mode)
 
     return jsonify({"job_id": job.id}), 200
 # ======================================================
 # CHECK PROGRESS
+# Plain poll, or a bounded long-poll with ?wait=<seconds>&since=<version>:
+# the request returns as soon as the job's state differs from `since`, or
+# after at most UPLOAD_LONGPOLL_SECONDS (kept well under the gunicorn worker
+# timeout). Events come from the in-process bus; a job running in another
+# worker process is seen by re-reading the row every
+# UPLOAD_LONGPOLL_RECHECK_SECONDS.
 # ======================================================
 @file_bp.route("/status/<int:job_id>", methods=["GET"])
 @jwt_required
@@ -137,11 +498,50 @@ def upload_status(job_id):
 
     job = UploadJob.query.get(job_id)
 
-    if not job:
+    if not job or job.user_id != g.current_user.id:
         return jsonify({"error": "Job not found"}), 404
 
-    return jsonify({
-        "total": job.total_files,
-        "processed": job.processed_files,
-        "status": job.status
-    })
+    try:
+        wait = float(request.args.get("wait", 0))
+    except ValueError:
+        wait = 0
+    wait = min(max(wait, 0), current_app.config["UPLOAD_LONGPOLL_SECONDS"])
+    since = request.args.get("since")
+
+    # subscribe before reading the snapshot so no event falls in between
+    events = job_events.subscribe(job_id) if wait else None
+    try:
+        state = upload_job_state(job)
+        if not wait or state["version"] != since or state["status"] in ("done", "failed"):
+            return jsonify(state)
+
+        db.session.close()     # don't hold a pooled connection while waiting
+        recheck = current_app.config["UPLOAD_LONGPOLL_RECHECK_SECONDS"]
+        deadline = time.monotonic() + wait
+        file_errors = []
+
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                kind, data = events.get(timeout=min(recheck, left))
+            except queue.Empty:
+                job = db.session.get(UploadJob, job_id)
+                if job is None:
+                    break
+                data = upload_job_state(job)
+                db.session.close()
+                kind = "progress"
+
+            if kind == "file_error":
+                file_errors.append(data)
+                continue
+            state = data
+            if state["version"] != since:
+                break
+
+        return jsonify(dict(state, file_errors=file_errors))
+    finally:
+        if events is not None:
+            job_events.unsubscribe(job_id, events)
@@ -12,9 +12,15 @@ class UploadedFile(db.Model):
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
     filesize = db.Column(db.Integer)
     table_name = db.Column(db.String, nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('upload_jobs.id', ondelete='SET NULL'), index=True)
+    content_hash = db.Column(db.String(64))     # sha256 of the uploaded bytes
 
     user = db.relationship('User', backref=db.backref('uploaded_files', lazy='dynamic'))
 
+    __table_args__ = (
+        db.Index('ix_uploaded_files_user_hash', 'user_id', 'content_hash'),
+    )
+
 # Upload Processing Job (tracks live upload progress)
 class UploadJob(db.Model):
     __tablename__ = "upload_jobs"
@@ -32,15 +38,64 @@ class UploadJob(db.Model):
 
     total_files = db.Column(db.Integer, nullable=False)
     processed_files = db.Column(db.Integer, default=0)
-
-    # processing / done / failed
-    status = db.Column(db.String(20), default="processing")
+    processed_rows = db.Column(db.Integer, default=0)
+
+    # queued / processing / done / failed
+    status = db.Column(db.String(20), default="queued", index=True)
+
+    # durable queue bookkeeping (see utils/job_queue.py)
+    file_paths = db.Column(db.Text)            # JSON list of saved upload paths
+    file_hashes = db.Column(db.Text)           # JSON list of their sha256, same order
+    duplicate_files = db.Column(db.Integer, default=0)
+    dedupe_mode = db.Column(db.String(10), default="off")   # off / skip / update
+    rows_inserted = db.Column(db.Integer, default=0)
+    rows_updated = db.Column(db.Integer, default=0)
+    rows_skipped = db.Column(db.Integer, default=0)
+    attempts = db.Column(db.Integer, default=0)
+    claimed_by = db.Column(db.String(120))
+    heartbeat_at = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     user = db.relationship('User', backref=db.backref('upload_jobs', lazy='dynamic'))
 
 
+# Export job (async Excel / CSV / Word export, artifact kept on disk)
+class ExportJob(db.Model):
+    __tablename__ = "export_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    format = db.Column(db.String(10), nullable=False)        # xlsx / csv / docx
+    table_name = db.Column(db.String(120))                   # names the Word file
+    selection_hash = db.Column(db.String(64), nullable=False)  # sha256 of the sorted ids
+    data_version = db.Column(db.Integer, nullable=False, default=0)
+
+    # queued / running / done / failed
+    status = db.Column(db.String(20), default="queued")
+    row_count = db.Column(db.Integer, default=0)
+    artifact_path = db.Column(db.String)
+    filename = db.Column(db.String)
+    error = db.Column(db.Text)
+
+    # durable bookkeeping: any web process can (re)run the job (utils/export_jobs.py)
+    entry_ids = db.Column(db.Text)             # JSON list of the selected document ids
+    claimed_by = db.Column(db.String(120))
+    heartbeat_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_export_jobs_cache_key', 'user_id', 'selection_hash', 'format', 'data_version'),
+    )
+
+
 # Documents table
 class Document(db.Model):
     __tablename__ = 'documents'
@@ -56,6 +111,11 @@ class Document(db.Model):
     docname = db.Column(db.String, index=True)
     registrationdate = db.Column(db.String)
     dateofexecution = db.Column(db.String)
+    # typed copies of the two text dates (NULL when the text is not a date),
+    # for the year and date-range filters
+    registration_date = db.Column(db.Date)
+    execution_date = db.Column(db.Date)
+    registration_year = db.Column(db.Integer)
 
     purchasername = db.Column(db.String, index=True)
     sellername = db.Column(db.String, index=True)
@@ -68,9 +128,62 @@ class Document(db.Model):
 
     raw_json = db.Column(db.Text)
 
+    # 'sro|docno|year' (extractor.natural_key), NULL when a part is missing.
+    # Not unique: "off" uploads keep repeated deeds; dedupe uploads match on it.
+    natural_key = db.Column(db.String)
+
     uploaded_file = db.relationship('UploadedFile', backref=db.backref('documents', lazy='dynamic'))
     user = db.relationship('User', backref=db.backref('documents', lazy='dynamic'))
 
+    __table_args__ = (
+        db.Index('ix_documents_user_natural_key', 'user_id', 'natural_key'),
+        # search access paths: always by user, newest first (see `flask check-indexes`)
+        db.Index('ix_documents_user_table_id', 'user_id', 'table_name', 'id'),
+        db.Index('ix_documents_user_docname', 'user_id', 'docname'),
+        db.Index('ix_documents_user_year', 'user_id', 'registration_year', 'id'),
+        db.Index('ix_documents_user_regdate', 'user_id', 'registration_date'),
+        db.Index('ix_documents_user_consideration', 'user_id', 'consideration_amt'),
+        db.Index('ix_documents_user_marketvalue', 'user_id', 'marketvalue'),
+    )
+
+
+# Search keys for purchaser / seller names, one row per name token
+# (utils/name_keys.py): transliterated to Latin, normalized, and a phonetic
+# skeleton. Answers /search?match=phonetic without scanning documents.
+class PartyNameKey(db.Model):
+    __tablename__ = 'party_name_keys'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), nullable=False)
+    role = db.Column(db.String(10), nullable=False)      # purchaser / seller
+    token = db.Column(db.String, nullable=False)
+    phonetic = db.Column(db.String, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_party_name_keys_phonetic', 'user_id', 'phonetic', 'role', 'document_id'),
+        db.Index('ix_party_name_keys_token', 'user_id', 'token', 'role', 'document_id'),
+        db.Index('ix_party_name_keys_document', 'document_id'),
+    )
+
+
+# Per-user data version (bumped whenever the user's documents change)
+class UserDataVersion(db.Model):
+    __tablename__ = 'user_data_versions'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Per-user dashboard counters, kept in step by the code paths that add or
+# remove rows (utils/user_stats.py); `flask reconcile-stats` recounts them
+class UserStats(db.Model):
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    documents = db.Column(db.Integer, nullable=False, default=0)
+    selected = db.Column(db.Integer, nullable=False, default=0)
+    uploads = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 # Selected Entries
 class SelectedEntry(db.Model):
@@ -85,6 +198,10 @@ class SelectedEntry(db.Model):
     document = db.relationship('Document', backref=db.backref('selected_entries', lazy='dynamic'))
     user = db.relationship('User', backref=db.backref('selected_entries', lazy='dynamic'))
 
+    __table_args__ = (
+        db.Index('ux_selected_entries_user_document', 'user_id', 'document_id', unique=True),
+    )
+
 
 # User
 class User(db.Model):
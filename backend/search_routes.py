@@ -1,12 +1,32 @@
-from flask import Blueprint, request, jsonify, g
-from sqlalchemy import text
+from datetime import datetime
 
-from models import db, Document, SelectedEntry
+from flask import Blueprint, request, jsonify, g, current_app
+from sqlalchemy import text, bindparam
+
+from models import db, SelectedEntry
+from extractor import iso_date
 from utils.jwt_utils import jwt_required
-from utils.helper_utils import build_in_params
+from utils.helper_utils import encode_cursor, decode_cursor
+from utils.fts_utils import (
+    FTS_COLUMNS, TRIGRAM_COLUMNS, TRIGRAM_MIN_CHARS,
+    build_match_query, build_trigram_query, fts_phrase, fts_tokens, pg_prefix_phrase, trigram_phrase
+)
+from utils.search_cache import result_cache, facet_cache, get_data_version
+from utils.user_stats import add_user_stats
+from utils.name_keys import name_match_clause
 
 search_bp = Blueprint("search", __name__)
 
+# ids per IN (...) statement on the selection endpoints (SQLite allows 999
+# bound variables on older builds)
+SELECT_CHUNK = 500
+
+# /search min_<name> / max_<name> parameters → column
+RANGE_AMOUNT_COLUMNS = {
+    "consideration": "consideration_amt",
+    "marketvalue": "marketvalue",
+}
+
 
 # ==========================================================
 # SEARCH API
@@ -23,15 +43,43 @@ def search():
     reg_date = request.args.get("registrationdate", "").strip()
     table_name = request.args.get("table_name", "").strip()
 
+    # ranges: registration date (YYYY-MM-DD) and amounts, bounds inclusive
+    date_from = request.args.get("date_from", "").strip()
+    date_to = request.args.get("date_to", "").strip()
+    amount_bounds = {
+        f"{prefix}_{name}": (column, op, request.args.get(f"{prefix}_{name}", "").strip())
+        for name, column in RANGE_AMOUNT_COLUMNS.items()
+        for prefix, op in (("min", ">="), ("max", "<="))
+    }
+
     # 🔑 NEW: group filter
     docname_filter = request.args.get("docname_filter", "").strip()
 
     exact = request.args.get("exact", "0") == "1"
 
+    # name matching for q / purchaser / seller: substring (default), or
+    # through the party_name_keys index
+    match = request.args.get("match", "").strip().lower()
+    if match not in ("", "phonetic", "translit"):
+        return jsonify({"error": "match must be phonetic or translit"}), 400
+
     page = int(request.args.get("page", 1))
     per_page = int(request.args.get("per_page", 100))
     offset = (page - 1) * per_page
 
+    # Keyset pagination: opaque cursor from a previous response's next_after_id
+    after_token = request.args.get("after_id", "").strip()
+    after_id = None
+    if after_token:
+        after_id = decode_cursor(after_token)
+        if after_id is None:
+            return jsonify({"error": "Invalid after_id cursor"}), 400
+
+    # exact (default) | estimate | none
+    count_mode = request.args.get("count", "exact").strip().lower()
+    if count_mode not in ("exact", "estimate", "none"):
+        return jsonify({"error": "count must be exact, estimate or none"}), 400
+
     user_id = g.current_user.id
 
     base_query = """
@@ -48,20 +96,7 @@ def search():
         where.append("d.table_name = :table_name")
         params["table_name"] = table_name
 
-    if q:
-        like_q = f"%{q}%"
-        where.append("""
-            (
-              d.purchasername LIKE :like_q OR
-              d.sellername LIKE :like_q OR
-              d.propertydescription LIKE :like_q OR
-              d.docname LIKE :like_q OR
-              d.docno LIKE :like_q OR
-              d.sroname LIKE :like_q OR
-              d.areaname LIKE :like_q
-            )
-        """)
-        params["like_q"] = like_q
+    like_fields = {}
 
     def add_filter(field, value, param):
         if not value:
@@ -70,8 +105,23 @@ def search():
             where.append(f"d.{field} = :{param}")
             params[param] = value
         else:
-            where.append(f"d.{field} LIKE :{param}")
-            params[param] = f"%{value}%"
+            like_fields[field] = value
+
+    # 🔤 names by transliterated / phonetic key (Devanagari and Latin alike)
+    if match:
+        for role, value in (("purchaser", purchaser), ("seller", seller), (None, q)):
+            if not value:
+                continue
+            clause = name_match_clause(value, role, match, f"name_{role or 'any'}", params)
+            if clause is None:
+                continue          # nothing name-like in it: normal filter below
+            where.append(clause)
+            if role == "purchaser":
+                purchaser = ""
+            elif role == "seller":
+                seller = ""
+            else:
+                q = ""
 
     add_filter("purchasername", purchaser, "purchaser")
     add_filter("sellername", seller, "seller")
@@ -79,31 +129,182 @@ def search():
     add_filter("docno", docno, "docno_param")
     add_filter("propertydescription", propdesc, "prop_param")
 
+    # 🔍 Full-text: answer q + substring filters from documents_fts (SQLite),
+    # or q from the search_tsv column (Postgres)
+    search_backend = current_app.config.get("SEARCH_BACKEND")
+
+    # substring filters that skip FTS and go straight to the LIKE fallback
+    like_only = {}
+
+    # infix filters (parts of names, gat / survey numbers, partial docno) → trigram index
+    if current_app.config.get("TRIGRAM_ENABLED"):
+        infix = {c: like_fields.pop(c) for c in TRIGRAM_COLUMNS if c in like_fields}
+        tri_expr, tri_short = build_trigram_query(infix)
+        # too short for trigrams: still a substring match ('01' in '1001'),
+        # not an FTS word prefix
+        like_only.update(tri_short)
+        if tri_expr:
+            where.append(
+                "d.id IN (SELECT rowid FROM documents_trigram WHERE documents_trigram MATCH :tri_match)"
+            )
+            params["tri_match"] = tri_expr
+
+        # q: any part of the trigram columns, word prefixes of the others;
+        # shorter q is a plain LIKE over every text column
+        if search_backend == "fts5" and q:
+            if len(q) < TRIGRAM_MIN_CHARS:
+                like_only[None] = q
+            else:
+                q_clause = "d.id IN (SELECT rowid FROM documents_trigram WHERE documents_trigram MATCH :tri_q)"
+                params["tri_q"] = trigram_phrase(q)
+                q_phrase = fts_phrase(q)
+                if q_phrase:
+                    q_clause = (f"({q_clause} OR d.id IN "
+                                "(SELECT rowid FROM documents_fts WHERE documents_fts MATCH :fts_q))")
+                    params["fts_q"] = q_phrase
+                where.append(q_clause)
+            q = ""
+
+    if search_backend == "fts5":
+        match_expr, leftovers = build_match_query(q, like_fields)
+    else:
+        match_expr, leftovers = None, dict(like_fields)
+        if q:
+            leftovers[None] = q
+
+    if match_expr:
+        where.append(
+            "d.id IN (SELECT rowid FROM documents_fts WHERE documents_fts MATCH :fts_match)"
+        )
+        params["fts_match"] = match_expr
+
+    leftovers.update(like_only)
+
+    if search_backend == "postgres" and q and fts_tokens(q):
+        del leftovers[None]
+        where.append(f"d.search_tsv @@ {pg_prefix_phrase('ts_q')}")
+        params["ts_q"] = q
+
+    # LIKE fallback (no FTS5, or text without indexable tokens). On Postgres
+    # ILIKE keeps SQLite's case-insensitive LIKE and uses the trigram indexes.
+    like_op = "ILIKE" if search_backend == "postgres" else "LIKE"
+    for i, (field, value) in enumerate(leftovers.items()):
+        param = f"like_{i}"
+        params[param] = f"%{value}%"
+        if field is None:
+            where.append("(" + " OR ".join(
+                f"d.{c} {like_op} :{param}" for c in FTS_COLUMNS
+            ) + ")")
+        else:
+            where.append(f"d.{field} {like_op} :{param}")
+
     # 🔑 APPLY GROUP FILTER BEFORE PAGINATION
     if docname_filter:
         where.append("d.docname = :docname_filter")
         params["docname_filter"] = docname_filter
 
-    # Year-only filtering
+    # Year-only filtering, on the stored (indexed) year
     if reg_date:
-        where.append("strftime('%Y', d.registrationdate) = :reg_year")
-        params["reg_year"] = reg_date
+        try:
+            params["reg_year"] = int(reg_date)
+            where.append("d.registration_year = :reg_year")
+        except ValueError:
+            where.append("1 = 0")     # not a year: nothing can match
+
+    for param, value, op in (("date_from", date_from, ">="), ("date_to", date_to, "<=")):
+        if not value:
+            continue
+        day = iso_date(value)
+        if day is None:
+            return jsonify({"error": f"{param} must be YYYY-MM-DD"}), 400
+        where.append(f"d.registration_date {op} :{param}")
+        params[param] = day.isoformat()
+
+    for param, (column, op, value) in amount_bounds.items():
+        if not value:
+            continue
+        try:
+            params[param] = float(value.replace(",", ""))
+        except ValueError:
+            return jsonify({"error": f"{param} must be a number"}), 400
+        where.append(f"d.{column} {op} :{param}")
 
     where_sql = " WHERE " + " AND ".join(where)
 
-    # COUNT (correct after filtering)
-    total_sql = text(f"SELECT COUNT(*) FROM documents d {where_sql}")
-    total = db.session.execute(total_sql, params).scalar()
+    # same filters → same SQL + params, so that is the normalized filter set
+    filter_key = (user_id, get_data_version(user_id), where_sql, tuple(sorted(params.items())))
+    result_key = filter_key + (count_mode, page, per_page, after_id)
+
+    cached = result_cache.get(result_key)
+    if cached is not None:
+        return jsonify(cached)
+
+    total = None
+    total_is_estimate = False
+    grouped = []
+
+    # total + docname groups depend only on the filters, never on the page
+    facets = facet_cache.get(filter_key) if count_mode != "none" else None
+
+    if facets is None and count_mode == "exact":
+        # ONE aggregate pass: per-docname counts, total is their sum
+        group_sql = text("""
+            SELECT d.docname, COUNT(*)
+            FROM documents d
+        """ + where_sql + """
+            GROUP BY d.docname
+            ORDER BY COUNT(*) DESC
+        """)
+
+        group_rows = db.session.execute(group_sql, params).fetchall()
+
+        facets = {
+            "total": sum(r[1] for r in group_rows),
+            "groups": [
+                {"docname": r[0], "count": r[1]}
+                for r in group_rows
+            ]
+        }
+        facet_cache.set(filter_key, facets)
+
+    if facets is not None:
+        total = facets["total"]
+        grouped = facets["groups"]
+
+    elif count_mode == "estimate":
+        # stop counting at the cap; enough to render "10,000+ results"
+        cap = current_app.config.get("SEARCH_COUNT_ESTIMATE_CAP", 10000)
+        total_sql = text(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM documents d {where_sql} LIMIT :count_cap) c"
+        )
+        total = db.session.execute(total_sql, dict(params, count_cap=cap + 1)).scalar()
+        if total > cap:
+            total = cap
+            total_is_estimate = True
+
+    # DATA: seek on the primary key when a cursor is given, else LIMIT/OFFSET
+    data_params = dict(params, limit=per_page + 1)
+    if after_id is not None:
+        data_sql = text(
+            base_query +
+            where_sql +
+            " AND d.id < :after_id ORDER BY d.id DESC LIMIT :limit"
+        )
+        data_params["after_id"] = after_id
+    else:
+        data_sql = text(
+            base_query +
+            where_sql +
+            " ORDER BY d.id DESC LIMIT :limit OFFSET :offset"
+        )
+        data_params["offset"] = offset
 
-    # DATA (correct pagination)
-    data_sql = text(
-        base_query +
-        where_sql +
-        " ORDER BY d.id DESC LIMIT :limit OFFSET :offset"
-    )
+    rows = db.session.execute(data_sql, data_params).fetchall()
 
-    params.update({"limit": per_page, "offset": offset})
-    rows = db.session.execute(data_sql, params).fetchall()
+    # one extra row tells us whether another page exists
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_after_id = encode_cursor(rows[-1][0]) if has_more and rows else None
 
     results = [{
         "id": r[0],
@@ -118,29 +319,18 @@ def search():
         "consideration_amt": r[9]
     } for r in rows]
 
-    # GROUP SUMMARY (still respects other filters)
-    group_sql = text("""
-        SELECT d.docname, COUNT(*)
-        FROM documents d
-    """ + where_sql + """
-        GROUP BY d.docname
-        ORDER BY COUNT(*) DESC
-    """)
-
-    group_rows = db.session.execute(group_sql, params).fetchall()
-
-    grouped = [
-        {"docname": r[0], "count": r[1]}
-        for r in group_rows
-    ]
-
-    return jsonify({
+    response = {
         "results": results,
         "total": total,
         "groups": grouped,
+        "total_is_estimate": total_is_estimate,
         "page": page,
-        "per_page": per_page
-    })
+        "per_page": per_page,
+        "next_after_id": next_after_id
+    }
+    result_cache.set(result_key, response)
+
+    return jsonify(response)
 
 # ==========================================================
 # LIST TABLES PER USER
@@ -165,44 +355,86 @@ def list_tables():
 @search_bp.route("/api/selected_rows", methods=["POST"])
 @jwt_required
 def api_selected_rows():
+    """
+    The selection basket, grouped by table. Optional body fields:
+      ids        only these document ids
+      table_name only this group
+      page, per_page  paginate (default: everything)
+    """
     data = request.get_json(force=True)
     ids = data.get("ids", []) or []
+    table_name = data.get("table_name")
 
     uid = g.current_user.id
 
-    if not ids:
-        sel = SelectedEntry.query.filter_by(user_id=uid).order_by(
-            SelectedEntry.created_at.desc()).all()
-    else:
-        try:
-            ids = [int(i) for i in ids]
-        except:
-            return jsonify({"error": "Invalid ids"}), 400
-
-        sel = SelectedEntry.query.filter(
-            SelectedEntry.user_id == uid,
-            SelectedEntry.document_id.in_(ids)
-        ).all()
-
-    if not sel:
-        return jsonify({"groups": []}), 200
-
-    doc_ids = [s.document_id for s in sel]
-    sel_map = {s.document_id: s for s in sel}
-
-    placeholders, params = build_in_params(doc_ids, "id")
-    params["uid"] = uid
+    try:
+        ids = [int(i) for i in ids]
+        page = max(int(data.get("page") or 1), 1)
+        per_page = int(data["per_page"]) if data.get("per_page") else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid ids"}), 400
+
+    if per_page is not None:
+        per_page = max(1, min(per_page, 5000))
+
+    # one join, no per-id bind parameters; an explicit id list goes in chunks
+    where = ["s.user_id = :uid"]
+    params = {"uid": uid}
+    if table_name:
+        where.append("d.table_name = :table_name")
+        params["table_name"] = table_name
 
-    sql = text(f"""
-        SELECT id, table_name, docno, docname, registrationdate, sroname,
-               sellername, purchasername, propertydescription, areaname,
-               consideration_amt, dateofexecution
-        FROM documents
-        WHERE id IN ({placeholders}) AND user_id = :uid
-        ORDER BY id DESC
-    """)
+    base_sql = f"""
+        FROM selected_entries s
+        JOIN documents d ON d.id = s.document_id AND d.user_id = s.user_id
+        WHERE {" AND ".join(where)}
+    """
+    select_cols = """
+        SELECT d.id, d.table_name, d.docno, d.docname, d.registrationdate, d.sroname,
+               d.sellername, d.purchasername, d.propertydescription, d.areaname,
+               d.consideration_amt, d.dateofexecution, s.id
+    """
 
-    rows = db.session.execute(sql, params).fetchall()
+    if ids:
+        ids = sorted(set(ids), reverse=True)
+        id_chunks = [ids[i:i + SELECT_CHUNK] for i in range(0, len(ids), SELECT_CHUNK)]
+        in_ids = " AND s.document_id IN :ids"
+
+        # per-group totals over every matched row, not just the page
+        count_sql = text(
+            "SELECT d.table_name, COUNT(*) " + base_sql + in_ids + " GROUP BY d.table_name"
+        ).bindparams(bindparam("ids", expanding=True))
+        group_counts = {}
+        for chunk in id_chunks:
+            for name, n in db.session.execute(count_sql, {**params, "ids": chunk}):
+                group_counts[name] = group_counts.get(name, 0) + n
+        total = sum(group_counts.values())
+
+        # chunks of the sorted ids come back in page order: stop at the page end
+        start, end = 0, None
+        if per_page is not None:
+            start, end = (page - 1) * per_page, page * per_page
+        chunk_sql = text(select_cols + base_sql + in_ids + " ORDER BY d.id DESC").bindparams(
+            bindparam("ids", expanding=True))
+        rows = []
+        for chunk in id_chunks:
+            if end is not None and len(rows) >= end:
+                break
+            rows.extend(db.session.execute(chunk_sql, {**params, "ids": chunk}).fetchall())
+        rows = rows[start:end]
+    else:
+        page_sql = select_cols + base_sql + " ORDER BY d.id DESC"
+        page_params = dict(params)
+        if per_page is not None:
+            page_sql += " LIMIT :limit OFFSET :offset"
+            page_params.update(limit=per_page, offset=(page - 1) * per_page)
+        rows = db.session.execute(text(page_sql), page_params).fetchall()
+
+        group_counts = dict(db.session.execute(
+            text("SELECT d.table_name, COUNT(*) " + base_sql + " GROUP BY d.table_name"),
+            params
+        ).fetchall())
+        total = sum(group_counts.values())
 
     groups = {}
 
@@ -214,11 +446,12 @@ def api_selected_rows():
             groups[table_name] = {
                 "table_name": table_name,
                 "chip_label": table_name,
+                "count": group_counts.get(table_name, 0),
                 "rows": []
             }
 
         groups[table_name]["rows"].append({
-            "sel_id": sel_map.get(doc_id).id,
+            "sel_id": r[12],
             "document_id": doc_id,
             "docno": r[2],
             "docname": r[3],
@@ -232,7 +465,12 @@ def api_selected_rows():
             "dateofexecution": r[11]
         })
 
-    return jsonify({"groups": list(groups.values())})
+    return jsonify({
+        "groups": list(groups.values()),
+        "total": total,
+        "page": page,
+        "per_page": per_page
+    })
 
 
 # ==========================================================
@@ -256,30 +494,39 @@ def api_save_selected():
     if not doc_ids:
         return jsonify({"error": "No valid document ids"}), 400
 
-    added = 0
-    for doc_id in doc_ids:
-        doc = Document.query.filter_by(id=doc_id, user_id=uid).first()
-        if not doc:
-            continue
-
-        exists = SelectedEntry.query.filter_by(
-            document_id=doc_id, user_id=uid).first()
-        if exists:
-            continue
-
-        sel = SelectedEntry(
-            user_id=uid,
-            document_id=doc_id,
-            table_name=doc.table_name,
-            label=doc.table_name
-        )
+    unique_ids = list(dict.fromkeys(doc_ids))
 
-        db.session.add(sel)
-        added += 1
+    # set-based: per chunk one ownership count and one INSERT ... SELECT;
+    # the unique (user_id, document_id) index turns repeats into no-ops
+    owned_sql = text("""
+        SELECT COUNT(*) FROM documents
+        WHERE user_id = :uid AND id IN :ids
+    """).bindparams(bindparam("ids", expanding=True))
 
+    insert_sql = text("""
+        INSERT INTO selected_entries (user_id, document_id, table_name, label, created_at)
+        SELECT :uid, d.id, d.table_name, d.table_name, :now
+        FROM documents d
+        WHERE d.user_id = :uid AND d.id IN :ids
+        ON CONFLICT (user_id, document_id) DO NOTHING
+    """).bindparams(bindparam("ids", expanding=True))
+
+    now = datetime.utcnow()
+    owned = added = 0
+    for i in range(0, len(unique_ids), SELECT_CHUNK):
+        params = {"uid": uid, "ids": unique_ids[i:i + SELECT_CHUNK], "now": now}
+        owned += db.session.execute(owned_sql, params).scalar()
+        added += db.session.execute(insert_sql, params).rowcount
+
+    add_user_stats(uid, selected=added)
     db.session.commit()
 
-    return jsonify({"added": added, "saved_total": len(doc_ids)})
+    return jsonify({
+        "added": added,
+        "duplicates": owned - added,
+        "not_found": len(unique_ids) - owned,
+        "saved_total": len(doc_ids)
+    })
 
 
 # ==========================================================
@@ -303,6 +550,7 @@ def api_remove_selected():
         return jsonify({"error": "Not found"}), 404
 
     db.session.delete(sel)
+    add_user_stats(sel.user_id, selected=-1)
     db.session.commit()
 
     return jsonify({"deleted": sid})
@@ -321,17 +569,17 @@ def api_remove_selected_group():
     if not table_name:
         return jsonify({"error": "Missing table_name"}), 400
 
-    docs = Document.query.filter_by(table_name=table_name, user_id=uid).all()
-    doc_ids = [d.id for d in docs]
-
-    if not doc_ids:
-        return jsonify({"deleted": 0})
-
-    deleted = SelectedEntry.query.filter(
-        SelectedEntry.user_id == uid,
-        SelectedEntry.document_id.in_(doc_ids)
-    ).delete(synchronize_session=False)
+    # one DELETE; the documents of the table are matched in a subquery
+    deleted = db.session.execute(text("""
+        DELETE FROM selected_entries
+        WHERE user_id = :uid
+          AND document_id IN (
+              SELECT id FROM documents
+              WHERE user_id = :uid AND table_name = :table_name
+          )
+    """), {"uid": uid, "table_name": table_name}).rowcount
 
+    add_user_stats(uid, selected=-deleted)
     db.session.commit()
 
     return jsonify({"deleted": deleted})
@@ -3,7 +3,9 @@ from datetime import datetime, timedelta
 from threading import Thread
 from time import sleep
 
-from models import db, UploadedFile
+from models import db, UploadedFile, ExportJob
+from utils.search_cache import bump_data_version
+from utils.user_stats import add_user_stats
 
 CLEANUP_DAYS = 30
 
@@ -20,6 +22,7 @@ def cleanup_old_files(app):
                 return
 
             removed = 0
+            touched_users = {}
             for f in old_files:
                 try:
                     if f.filepath and os.path.exists(f.filepath):
@@ -29,16 +32,49 @@ def cleanup_old_files(app):
 
                 try:
                     db.session.delete(f)
+                    touched_users[f.user_id] = touched_users.get(f.user_id, 0) + 1
                     removed += 1
                 except Exception as e:
                     app.logger.warning(f"Could not delete DB record for {f.id}: {e}")
 
+            # cached searches of these users must not outlive the change
+            for uid, n in touched_users.items():
+                bump_data_version(uid)
+                add_user_stats(uid, uploads=-n)
+
             db.session.commit()
             app.logger.info(f"Cleanup: removed {removed} uploaded file records.")
         except Exception as e:
             app.logger.error(f"Cleanup error: {e}")
 
 
+def cleanup_old_exports(app):
+    """
+    Deletes export artifacts (and their job rows) older than
+    EXPORT_RETENTION_HOURS.
+    """
+    with app.app_context():
+        try:
+            cutoff = datetime.utcnow() - timedelta(hours=app.config["EXPORT_RETENTION_HOURS"])
+            old_jobs = ExportJob.query.filter(ExportJob.created_at < cutoff).all()
+            if not old_jobs:
+                return
+
+            for job in old_jobs:
+                try:
+                    if job.artifact_path and os.path.exists(job.artifact_path):
+                        os.remove(job.artifact_path)
+                except Exception as e:
+                    app.logger.warning(f"Could not remove export {job.artifact_path}: {e}")
+                db.session.delete(job)
+
+            db.session.commit()
+            app.logger.info(f"Cleanup: removed {len(old_jobs)} export jobs.")
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Export cleanup error: {e}")
+
+
 def start_cleanup_thread(app, interval_seconds=24*60*60):
     """
     Start background daemon thread that runs cleanup once every interval_seconds.
@@ -48,6 +84,7 @@ def start_cleanup_thread(app, interval_seconds=24*60*60):
         while True:
             try:
                 cleanup_old_files(app)
+                cleanup_old_exports(app)
             except Exception as e:
                 app.logger.error(f"Cleanup worker error: {e}")
             sleep(interval_seconds)
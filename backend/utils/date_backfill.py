@@ -0,0 +1,73 @@
+from sqlalchemy import select, update, bindparam, func, or_, and_
+
+from models import db, Document
+from extractor import normalize_date, iso_date
+from utils.search_cache import bump_data_version
+
+
+def backfill_document_dates(user_id=None, batch_size=5000):
+    """
+    Fill registration_date / execution_date / registration_year for rows
+    ingested before those columns existed. The text is run through
+    normalize_date again, so dates stored unparsed by older ingests
+    ('12/03/2018') are picked up too; text that still is not a date stays
+    NULL. Walks the table by id and commits per batch.
+    Returns (rows scanned, rows updated).
+    """
+    t = Document.__table__
+    pending = or_(
+        and_(t.c.registrationdate.isnot(None), t.c.registration_date.is_(None)),
+        and_(t.c.dateofexecution.isnot(None), t.c.execution_date.is_(None)),
+    )
+
+    stmt = (
+        update(t)
+        .where(t.c.id == bindparam("row_id"))
+        .values(
+            registration_date=func.coalesce(t.c.registration_date, bindparam("reg_date", type_=db.Date)),
+            execution_date=func.coalesce(t.c.execution_date, bindparam("exec_date", type_=db.Date)),
+            registration_year=func.coalesce(t.c.registration_year, bindparam("reg_year", type_=db.Integer)),
+        )
+    )
+
+    scanned = updated = 0
+    users = set()
+    last_id = 0
+    while True:
+        query = (
+            select(t.c.id, t.c.user_id, t.c.registrationdate, t.c.dateofexecution)
+            .where(t.c.id > last_id, pending)
+            .order_by(t.c.id)
+            .limit(batch_size)
+        )
+        if user_id is not None:
+            query = query.where(t.c.user_id == user_id)
+
+        rows = db.session.execute(query).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        scanned += len(rows)
+
+        changes = []
+        for r in rows:
+            reg = iso_date(normalize_date(r.registrationdate))
+            exe = iso_date(normalize_date(r.dateofexecution))
+            if reg is None and exe is None:
+                continue
+            changes.append({
+                "row_id": r.id, "reg_date": reg, "exec_date": exe,
+                "reg_year": reg.year if reg else None,
+            })
+            users.add(r.user_id)
+
+        if changes:
+            db.session.execute(stmt, changes)
+            updated += len(changes)
+        db.session.commit()
+
+    for uid in users:
+        bump_data_version(uid)
+    db.session.commit()
+
+    return scanned, updated
@@ -0,0 +1,76 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# PRAGMAs set on every new SQLite connection, per DB_PROFILE.
+#   "tuned": WAL (readers never wait for the ingest writer), fsync only at
+#            checkpoints, memory-mapped reads, a bigger page cache and a busy
+#            handler instead of an immediate "database is locked".
+#   "plain": SQLite defaults (rollback journal, pysqlite's 5 s busy wait).
+SQLITE_PROFILES = ("tuned", "plain")
+
+
+def sqlite_pragmas(config):
+    profile = config["DB_PROFILE"]
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"DB_PROFILE must be one of {', '.join(SQLITE_PROFILES)}, not {profile!r}")
+    if profile == "plain":
+        return []
+    return [
+        ("journal_mode", "WAL"),
+        ("synchronous", config["SQLITE_SYNCHRONOUS"]),
+        ("busy_timeout", config["SQLITE_BUSY_TIMEOUT_MS"]),
+        ("mmap_size", config["SQLITE_MMAP_SIZE"]),
+        # negative = KiB rather than pages
+        ("cache_size", -config["SQLITE_CACHE_SIZE_KB"]),
+        ("temp_store", "MEMORY"),
+    ]
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database: a pool sized for
+    the backend. Must be set before db.init_app().
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+
+    if url.get_backend_name() == "sqlite":
+        if not url.database or url.database == ":memory:":
+            return {}   # SQLAlchemy's single-connection pool is required there
+        # one connection per worker/ingest thread; SQLite serializes the
+        # writers itself, so a small pool and no overflow storm
+        return {
+            "pool_size": config["DB_POOL_SIZE"],
+            "max_overflow": config["DB_MAX_OVERFLOW"],
+            "pool_timeout": config["DB_POOL_TIMEOUT"],
+        }
+
+    # server databases: connections die behind load balancers / restarts
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": True,
+    }
+
+
+def install_connect_hook(engine, config):
+    """
+    Apply the SQLite profile PRAGMAs to each new pooled connection.
+    Needs to run before the engine's first connect.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = sqlite_pragmas(config)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas:
+                cur.execute(f"PRAGMA {name}={value}")
+        finally:
+            cur.close()
@@ -0,0 +1,78 @@
+import queue
+from threading import Lock
+
+
+class JobEventBus:
+    """
+    In-process pub/sub for upload job progress. Every subscriber (one waiting
+    status long-poll) gets its own bounded queue, so a slow client never blocks
+    the DB writer; when its queue is full the oldest event is dropped
+    (progress events supersede each other).
+    """
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._subs = {}
+        self._lock = Lock()
+
+    def subscribe(self, job_id):
+        q = queue.Queue(maxsize=self.maxsize)
+        with self._lock:
+            self._subs.setdefault(job_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, job_id, q):
+        with self._lock:
+            subs = self._subs.get(job_id)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._subs[job_id]
+
+    def publish(self, job_id, kind, data):
+        with self._lock:
+            subs = list(self._subs.get(job_id, ()))
+
+        for q in subs:
+            try:
+                q.put_nowait((kind, data))
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    q.put_nowait((kind, data))
+                except queue.Full:
+                    pass
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+
+job_events = JobEventBus()
+
+
+def upload_job_state(job):
+    """
+    Public progress view of an UploadJob (status endpoint payload).
+    `version` changes whenever the progress does; long-polls wait on it.
+    """
+    processed = job.processed_files
+    rows = job.processed_rows or 0
+    return {
+        "version": f"{job.status}.{processed}.{rows}.{job.attempts or 0}",
+        "total": job.total_files,
+        "processed": processed,
+        "rows": rows,
+        "duplicates": job.duplicate_files or 0,
+        "dedupe": job.dedupe_mode or "off",
+        "inserted": job.rows_inserted or 0,
+        "updated": job.rows_updated or 0,
+        "skipped": job.rows_skipped or 0,
+        "status": job.status,
+        "attempts": job.attempts or 0,
+        "error": job.last_error
+    }
+
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock, Thread, Event
+
+from sqlalchemy import text
+
+from models import db, ExportJob
+from utils.search_cache import get_data_version
+from utils.export_utils import XLSX_MIMETYPE, DOCX_MIMETYPE, CSV_MIMETYPE
+from utils.job_queue import worker_id
+
+# format -> download mimetype
+EXPORT_FORMATS = {
+    "xlsx": XLSX_MIMETYPE,
+    "csv": CSV_MIMETYPE,
+    "docx": DOCX_MIMETYPE,
+}
+
+# One bounded pool per web process, created on first submit, and the jobs
+# it holds (job id -> future) so a status lookup knows what runs here.
+_executor = None
+_executor_lock = Lock()
+_futures = {}
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config["EXPORT_WORKERS"],
+                thread_name_prefix="export-worker"
+            )
+        return _executor
+
+
+def selection_hash(ids, table_name=""):
+    """
+    sha256 of the sorted, de-duplicated id set (plus the table name, which
+    names the Word file). Same selection → same hash, in any order.
+    """
+    digest = hashlib.sha256(table_name.encode("utf-8"))
+    for doc_id in sorted(set(ids)):
+        digest.update(b"%d," % doc_id)
+    return digest.hexdigest()
+
+
+def export_job_state(job):
+    return {
+        "job_id": job.id,
+        "format": job.format,
+        "status": job.status,
+        "rows": job.row_count or 0,
+        "filename": job.filename,
+        "error": job.error,
+        "download_url": f"/export/jobs/{job.id}/download" if job.status == "done" else None
+    }
+
+
+def _submit(app, job_id):
+    with _executor_lock:
+        fut = _futures.get(job_id)
+        if fut is not None and not fut.done():
+            return
+    fut = _get_executor(app).submit(run_export_job, app, job_id)
+    with _executor_lock:
+        _futures[job_id] = fut
+    fut.add_done_callback(lambda _: _futures.pop(job_id, None))
+
+
+def resume_export_job(app, job):
+    """
+    Pool threads die with their process, and a job queued in another
+    process's pool waits there: hand a queued job, or a running one whose
+    heartbeat stopped, to this process's pool. The claim in run_export_job
+    lets only one pool run it; a job out of attempts is failed instead.
+    """
+    if job.status not in ("queued", "running"):
+        return
+    fut = _futures.get(job.id)
+    if fut is not None and not fut.done():
+        return
+
+    stale_before = datetime.utcnow() - timedelta(seconds=app.config["EXPORT_JOB_STALE_SECONDS"])
+    if job.status == "running" and (job.heartbeat_at or job.created_at) >= stale_before:
+        return
+
+    if not job.entry_ids or (job.attempts or 0) >= app.config["EXPORT_MAX_ATTEMPTS"]:
+        job.status = "failed"
+        job.error = job.error or "export worker lost"
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return
+
+    _submit(app, job.id)
+
+
+def submit_export_job(app, uid, ids, fmt, table_name=""):
+    """
+    Return (job, cached). An identical export of the same data version that
+    is finished (artifact still on disk) or still in progress is reused;
+    otherwise a new job goes to the pool.
+    """
+    from export_routes import export_filename
+
+    key = selection_hash(ids, table_name)
+    version = get_data_version(uid)
+
+    existing = (
+        ExportJob.query
+        .filter_by(user_id=uid, selection_hash=key, format=fmt, data_version=version)
+        .filter(ExportJob.status.in_(("queued", "running", "done")))
+        .order_by(ExportJob.id.desc())
+        .first()
+    )
+    if existing is not None:
+        resume_export_job(app, existing)
+        if existing.status in ("queued", "running"):
+            return existing, True
+        if existing.status == "done" and existing.artifact_path and os.path.exists(existing.artifact_path):
+            return existing, True
+
+    job = ExportJob(
+        user_id=uid,
+        format=fmt,
+        table_name=table_name or None,
+        selection_hash=key,
+        data_version=version,
+        status="queued",
+        filename=export_filename(fmt, table_name),
+        entry_ids=json.dumps(list(ids)),
+        attempts=0
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _submit(app, job.id)
+    return job, False
+
+
+def claim_export_job(app, job_id, me):
+    """
+    queued (or running with a stale heartbeat) → running for `me`; the
+    conditional UPDATE is the lock. Returns True if this worker got it.
+    """
+    now = datetime.utcnow()
+    claimed = db.session.execute(text("""
+        UPDATE export_jobs
+        SET status = 'running', claimed_by = :me, heartbeat_at = :now,
+            attempts = COALESCE(attempts, 0) + 1
+        WHERE id = :id AND COALESCE(attempts, 0) < :max_attempts
+          AND (status = 'queued'
+               OR (status = 'running' AND COALESCE(heartbeat_at, created_at) < :stale))
+    """), {
+        "id": job_id, "me": me, "now": now,
+        "max_attempts": app.config["EXPORT_MAX_ATTEMPTS"],
+        "stale": now - timedelta(seconds=app.config["EXPORT_JOB_STALE_SECONDS"]),
+    }).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def _heartbeat(app, job_id, me, stop):
+    every = max(app.config["EXPORT_JOB_STALE_SECONDS"] / 4, 1)
+    while not stop.wait(every):
+        with app.app_context():
+            try:
+                db.session.execute(text(
+                    "UPDATE export_jobs SET heartbeat_at = :now WHERE id = :id AND claimed_by = :me"
+                ), {"id": job_id, "me": me, "now": datetime.utcnow()})
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"Export job {job_id} heartbeat failed: {e}")
+            finally:
+                db.session.remove()
+
+
+def _finish(job_id, me, **values):
+    """
+    Write the outcome only while `me` still holds the claim.
+    """
+    t = ExportJob.__table__
+    db.session.execute(
+        t.update().where(t.c.id == job_id, t.c.claimed_by == me)
+        .values(finished_at=datetime.utcnow(), **values)
+    )
+    db.session.commit()
+
+
+def run_export_job(app, job_id):
+    # imported here: export_routes imports this module
+    from export_routes import write_export
+
+    with app.app_context():
+        me = worker_id()
+        stop = Event()
+        try:
+            if not claim_export_job(app, job_id, me):
+                return      # done, or running in another worker
+
+            job = db.session.get(ExportJob, job_id)
+            ids = json.loads(job.entry_ids)
+            Thread(target=_heartbeat, args=(app, job_id, me, stop), daemon=True).start()
+
+            folder = os.path.join(app.config["EXPORT_FOLDER"], str(job.user_id))
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"{job.id}.{job.format}")
+            fmt, user_id = job.format, job.user_id
+            db.session.commit()     # don't hold a transaction while writing
+
+            rows = write_export(fmt, path, user_id, ids)
+            _finish(job_id, me, row_count=rows, artifact_path=path, status="done")
+        except Exception as e:
+            db.session.rollback()
+            _finish(job_id, me, status="failed", error=str(e))
+            app.logger.error(f"Export job {job_id} failed: {e}")
+        finally:
+            stop.set()
+            db.session.remove()
@@ -0,0 +1,133 @@
+import csv
+import io
+import os
+
+from openpyxl import Workbook
+from sqlalchemy import select
+
+from models import db, Document
+
+EXCEL_HEADERS = [
+    "ID", "Doc No", "Doc Name", "Purchaser", "Seller",
+    "Registration Date", "Area", "Consideration"
+]
+
+# same order as EXCEL_HEADERS; only these columns are read for an export
+EXCEL_COLUMNS = [
+    Document.id, Document.docno, Document.docname, Document.purchasername,
+    Document.sellername, Document.registrationdate, Document.areaname,
+    Document.consideration_amt
+]
+
+# fields the Word report uses per deed
+WORD_COLUMNS = [
+    Document.id, Document.docno, Document.docname, Document.registrationdate,
+    Document.sroname, Document.sellername, Document.purchasername,
+    Document.propertydescription
+]
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+DOCX_MIMETYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+CSV_MIMETYPE = "text/csv; charset=utf-8"
+
+
+def parse_ids(entries):
+    """
+    Integer document ids from the [{"id": ...}, ...] export payload.
+    """
+    ids = []
+    for e in entries or []:
+        try:
+            ids.append(int(e.get("id")))
+        except (TypeError, ValueError, AttributeError):
+            continue
+    return ids
+
+
+def iter_export_rows(uid, ids, columns=EXCEL_COLUMNS, chunk_size=1000):
+    """
+    Yield plain tuples of `columns` for the user's documents in `ids`,
+    one IN (...) chunk at a time: no ORM objects, bounded memory, and no
+    bound-variable limit however large the selection is.
+    """
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        yield from db.session.execute(
+            select(*columns)
+            .where(Document.id.in_(chunk), Document.user_id == uid)
+            .order_by(Document.id)
+        )
+
+
+def write_xlsx(target, rows, headers=EXCEL_HEADERS):
+    """
+    Write rows through openpyxl's write-only mode (rows go straight to a
+    temp XML part instead of a cell tree). `target` is a path or file.
+    Returns the number of data rows.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(headers)
+
+    count = 0
+    for row in rows:
+        ws.append(list(row))
+        count += 1
+
+    wb.save(target)
+    return count
+
+
+def iter_csv(rows, headers=EXCEL_HEADERS):
+    """
+    Encode rows as CSV text chunks (with a BOM so Excel reads Devanagari).
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    buf.write("\ufeff")
+    writer.writerow(headers)
+
+    for n, row in enumerate(rows, 1):
+        writer.writerow(["" if v is None else v for v in row])
+        if n % 500 == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    yield buf.getvalue()
+
+
+def write_csv(path, rows, headers=EXCEL_HEADERS):
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in iter_csv(counted(), headers):
+            f.write(chunk)
+    return count
+
+
+def iter_file(path, chunk_size=64 * 1024, remove=False):
+    """
+    Read a file in chunks for a streamed response; optionally delete it
+    once sent (or once the client went away).
+    """
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if remove:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
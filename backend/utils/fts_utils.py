@@ -1,24 +1,103 @@
+import unicodedata
+
 from sqlalchemy import text
 
+# Columns of `documents` mirrored into the FTS index (order matters for triggers)
+FTS_COLUMNS = [
+    "purchasername",
+    "sellername",
+    "propertydescription",
+    "docname",
+    "docno",
+    "sroname",
+    "areaname",
+]
+
+_FTS_COLS_SQL = ", ".join(FTS_COLUMNS)
+_NEW_COLS_SQL = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_OLD_COLS_SQL = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+# unicode61 by default only treats L*, N* and Co as token characters, so
+# Devanagari vowel signs / viramas (M*) split words: 'रमेश' → 'रम' 'श' and
+# "रमेश"* also matched 'रमा शिंदे'. Keep the marks inside the token.
+FTS_TOKENIZER = "unicode61 categories 'L* N* Co M*'"
+
+# External-content table: rowid == documents.id, the text lives in `documents`
+FTS_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE documents_fts
+    USING fts5(
+        {_FTS_COLS_SQL},
+        content='documents',
+        content_rowid='id',
+        tokenize="{FTS_TOKENIZER}"
+    )
+"""
+
+FTS_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts(rowid, {_FTS_COLS_SQL})
+        VALUES (new.id, {_NEW_COLS_SQL});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, {_FTS_COLS_SQL})
+        VALUES ('delete', old.id, {_OLD_COLS_SQL});
+    END
+    """,
+    # only re-index when an indexed column changes (file_id SET NULL on cleanup
+    # must not rewrite the whole index)
+    f"""
+    CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE OF {_FTS_COLS_SQL} ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, {_FTS_COLS_SQL})
+        VALUES ('delete', old.id, {_OLD_COLS_SQL});
+        INSERT INTO documents_fts(rowid, {_FTS_COLS_SQL})
+        VALUES (new.id, {_NEW_COLS_SQL});
+    END
+    """,
+]
+
+
+def _normalize_sql(sql):
+    return " ".join((sql or "").split()).lower()
+
+
 def ensure_fts_table(db):
     """
-    Attempt to create the FTS5 virtual table if SQLite compiled with FTS5.
-    Safe to call every startup.
+    Create (or upgrade) the FTS5 index over `documents` and the triggers that
+    keep it in sync on insert / update / delete.
+    Safe to call every startup. Returns True when FTS5 search is usable.
     """
+    if db.engine.dialect.name != "sqlite":
+        return False
+
     try:
-        db.session.execute(text("""
-            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts 
-            USING fts5(
-                docid UNINDEXED, 
-                purchasername, 
-                sellername, 
-                propertydescription, 
-                docname, 
-                docno, 
-                content=''
-            );
-        """))
+        existing = db.session.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='documents_fts'"
+        )).scalar()
+
+        rebuild = False
+        if existing and _normalize_sql(existing) != _normalize_sql(FTS_TABLE_SQL):
+            # older layout (contentless, or the default tokenizer) → replace it
+            db.session.execute(text("DROP TABLE documents_fts"))
+            existing = None
+
+        if not existing:
+            db.session.execute(text(FTS_TABLE_SQL))
+            rebuild = True
+
+        for sql in FTS_TRIGGERS_SQL:
+            db.session.execute(text(sql))
+
+        if rebuild:
+            # index rows that were ingested before the FTS table existed
+            db.session.execute(text(
+                "INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')"
+            ))
+
         db.session.commit()
+        return True
     except Exception as e:
         # FTS may not be available in the SQLite build; ignore but log if you have logger access
         try:
@@ -26,3 +105,232 @@ def ensure_fts_table(db):
         except:
             pass
         print("FTS5 not available or create failed:", e)
+        return False
+
+
+def fts_tokens(value):
+    """
+    Split text the way documents_fts is tokenized (FTS_TOKENIZER): letters,
+    digits, private-use characters and combining marks (Devanagari matras,
+    virama) are token characters, everything else separates tokens.
+    """
+    tokens, cur = [], []
+    for ch in value or "":
+        cat = unicodedata.category(ch)
+        if cat[0] in "LNM" or cat == "Co":
+            cur.append(ch)
+        elif cur:
+            tokens.append("".join(cur))
+            cur = []
+    if cur:
+        tokens.append("".join(cur))
+    return tokens
+
+
+def fts_phrase(value):
+    """
+    Turn free user text into an FTS5 prefix phrase: 'ramesh pat' → '"ramesh pat"*'.
+    Returns None when the text has no indexable tokens (caller falls back to LIKE).
+    """
+    tokens = fts_tokens(value)
+    if not tokens:
+        return None
+    return '"' + " ".join(tokens) + '"*'
+
+
+def build_match_query(q=None, fields=None):
+    """
+    Build one MATCH expression for the free-text query and per-column filters.
+
+    fields: {column_name: user_text}
+    Returns (match_expr, leftovers) where leftovers is the {column: value} subset
+    that produced no FTS tokens and must be filtered with LIKE instead.
+    """
+    parts = []
+    leftovers = {}
+
+    if q:
+        phrase = fts_phrase(q)
+        if phrase:
+            parts.append(phrase)
+        else:
+            leftovers[None] = q
+
+    for col, value in (fields or {}).items():
+        if not value:
+            continue
+        phrase = fts_phrase(value)
+        if phrase:
+            parts.append(f"{col} : {phrase}")
+        else:
+            leftovers[col] = value
+
+    match_expr = " AND ".join(f"({p})" for p in parts) if parts else None
+    return match_expr, leftovers
+
+
+# =========================================================
+# SQLITE: trigram index for infix filters
+# Survey / gat / CTS numbers ("123/4"), partial document numbers and parts
+# of names ('atil' in 'Patil') are substrings, not tokens; FTS5's trigram
+# tokenizer (SQLite 3.34+) answers '%...%' for any text of 3+ characters
+# from the index.
+# =========================================================
+TRIGRAM_COLUMNS = ["purchasername", "sellername", "propertydescription", "docno"]
+TRIGRAM_MIN_CHARS = 3
+
+_TRI_COLS_SQL = ", ".join(TRIGRAM_COLUMNS)
+_TRI_NEW_SQL = ", ".join(f"new.{c}" for c in TRIGRAM_COLUMNS)
+_TRI_OLD_SQL = ", ".join(f"old.{c}" for c in TRIGRAM_COLUMNS)
+
+TRIGRAM_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE documents_trigram
+    USING fts5(
+        {_TRI_COLS_SQL},
+        content='documents',
+        content_rowid='id',
+        tokenize='trigram'
+    )
+"""
+
+TRIGRAM_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS documents_trigram_ai AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_trigram(rowid, {_TRI_COLS_SQL})
+        VALUES (new.id, {_TRI_NEW_SQL});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS documents_trigram_ad AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_trigram(documents_trigram, rowid, {_TRI_COLS_SQL})
+        VALUES ('delete', old.id, {_TRI_OLD_SQL});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS documents_trigram_au AFTER UPDATE OF {_TRI_COLS_SQL} ON documents BEGIN
+        INSERT INTO documents_trigram(documents_trigram, rowid, {_TRI_COLS_SQL})
+        VALUES ('delete', old.id, {_TRI_OLD_SQL});
+        INSERT INTO documents_trigram(rowid, {_TRI_COLS_SQL})
+        VALUES (new.id, {_TRI_NEW_SQL});
+    END
+    """,
+]
+
+
+def ensure_trigram_table(db):
+    """
+    Create the trigram index over TRIGRAM_COLUMNS and its sync triggers;
+    indexes existing rows when the table is new or its columns changed.
+    Safe to call every startup. Returns True when trigram search is usable.
+    """
+    if db.engine.dialect.name != "sqlite":
+        return False
+
+    try:
+        existing = db.session.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='documents_trigram'"
+        )).scalar()
+
+        if existing and _normalize_sql(existing) != _normalize_sql(TRIGRAM_TABLE_SQL):
+            # column list changed: the triggers name the old columns too
+            for suffix in ("ai", "ad", "au"):
+                db.session.execute(text(f"DROP TRIGGER IF EXISTS documents_trigram_{suffix}"))
+            db.session.execute(text("DROP TABLE documents_trigram"))
+            existing = None
+
+        if not existing:
+            db.session.execute(text(TRIGRAM_TABLE_SQL))
+
+        for sql in TRIGRAM_TRIGGERS_SQL:
+            db.session.execute(text(sql))
+
+        if not existing:
+            db.session.execute(text(
+                "INSERT INTO documents_trigram(documents_trigram) VALUES ('rebuild')"
+            ))
+
+        db.session.commit()
+        return True
+    except Exception as e:
+        # trigram tokenizer needs SQLite 3.34+; older builds keep LIKE
+        db.session.rollback()
+        print("FTS5 trigram index not available:", e)
+        return False
+
+
+def build_trigram_query(fields):
+    """
+    MATCH expression for {column: text} infix filters on the trigram table.
+    Returns (match_expr, leftovers): values shorter than TRIGRAM_MIN_CHARS
+    can't be looked up by trigram and are left to the caller.
+    """
+    parts = []
+    leftovers = {}
+    for col, value in fields.items():
+        if len(value) < TRIGRAM_MIN_CHARS:
+            leftovers[col] = value
+            continue
+        parts.append(f"{col} : {trigram_phrase(value)}")
+
+    return (" AND ".join(parts) if parts else None), leftovers
+
+
+def trigram_phrase(value):
+    """
+    Quoted phrase for the trigram table: matches `value` anywhere in the text.
+    """
+    return '"' + value.replace('"', '""') + '"'
+
+
+# =========================================================
+# POSTGRESQL: tsvector for q, pg_trgm for substring filters
+# =========================================================
+PG_TS_CONFIG = "simple"     # no stemming: Marathi and English names side by side
+
+_PG_TSV_SOURCE = " || ' ' || ".join(f"coalesce({c}, '')" for c in FTS_COLUMNS)
+
+PG_SEARCH_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # generated column: kept in sync by Postgres on INSERT / UPDATE / COPY
+    f"""
+    ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('{PG_TS_CONFIG}', {_PG_TSV_SOURCE})) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_documents_search_tsv ON documents USING GIN (search_tsv)",
+] + [
+    # ILIKE '%...%' on these is answered from the trigram index
+    f"CREATE INDEX IF NOT EXISTS ix_documents_{c}_trgm ON documents USING GIN ({c} gin_trgm_ops)"
+    for c in FTS_COLUMNS
+]
+
+
+def ensure_pg_search(db):
+    """
+    Create the tsvector column and the GIN (tsvector + trigram) indexes on
+    PostgreSQL. Safe to call every startup. Returns True when usable.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return False
+
+    try:
+        for sql in PG_SEARCH_SQL:
+            db.session.execute(text(sql))
+        db.session.commit()
+        return True
+    except Exception as e:
+        # e.g. no permission to CREATE EXTENSION → plain ILIKE search
+        db.session.rollback()
+        print("Postgres search indexes not available:", e)
+        return False
+
+
+def pg_prefix_phrase(param):
+    """
+    SQL tsquery for the text bound to :param with the FTS5 phrase semantics:
+    'Ramesh Pat' → 'ramesh' <-> 'pat':*. Postgres splits the text itself,
+    with the parser that built search_tsv, so the query and the column agree
+    on where a word ends (Devanagari vowel signs included).
+    """
+    # append :* after the last lexeme's closing quote; '' stays an empty query
+    return (f"regexp_replace(phraseto_tsquery('{PG_TS_CONFIG}', :{param})::text, "
+            "'''$', ''':*')::tsquery")
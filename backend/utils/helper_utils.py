@@ -1,4 +1,6 @@
 import os
+import base64
+import hashlib
 
 ALLOWED_EXT = {"xls", "xlsx", "csv"}
 
@@ -6,6 +8,22 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXT
 
 
+def save_with_hash(file_storage, path, chunk_size=1024 * 1024):
+    """
+    Stream an uploaded file to disk and return the sha256 of its bytes,
+    computed on the way through (no second read of the file).
+    """
+    digest = hashlib.sha256()
+    with open(path, "wb") as out:
+        while True:
+            chunk = file_storage.stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
 def safe_float(v):
     try:
         if v is None or v == "" or str(v).strip() == "":
@@ -15,12 +33,24 @@ def safe_float(v):
         return None
 
 
-def build_in_params(int_ids, prefix="id"):
+def encode_cursor(last_id):
+    """
+    Opaque keyset cursor for paginated lists: 1234 → 'aWQ6MTIzNA'.
+    """
+    raw = f"id:{int(last_id)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
     """
-    Given a list of ints, returns a tuple:
-      (" :id0, :id1, :id2 ", { "id0": val0, "id1": val1, ... })
-    Used to create parameterized IN (...) SQL fragments.
+    Reverse of encode_cursor. Returns the id, or None if the token is malformed.
     """
-    placeholders = ", ".join([f":{prefix}{i}" for i in range(len(int_ids))])
-    params = {f"{prefix}{i}": int_ids[i] for i in range(len(int_ids))}
-    return placeholders, params
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        prefix, value = raw.split(":", 1)
+        if prefix != "id":
+            return None
+        return int(value)
+    except Exception:
+        return None
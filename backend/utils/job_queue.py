@@ -0,0 +1,217 @@
+import json
+import os
+import socket
+from datetime import datetime, timedelta
+from threading import Thread, Event, current_thread
+
+from sqlalchemy import text
+
+from models import db, UploadJob
+from utils.events import job_events, upload_job_state
+
+# Set by enqueue in this process so an idle worker picks the job up at once
+# instead of waiting for its next poll.
+_wakeup = Event()
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{current_thread().name}"
+
+
+def enqueue_upload_job(uid, table_name, saved_paths, content_hashes=None, dedupe_mode="off"):
+    """
+    Persist an upload job; a queue worker (in any web process) will run it.
+    """
+    job = UploadJob(
+        user_id=uid,
+        table_name=table_name,
+        total_files=len(saved_paths),
+        processed_files=0,
+        processed_rows=0,
+        status="queued",
+        file_paths=json.dumps(saved_paths),
+        file_hashes=json.dumps(content_hashes) if content_hashes else None,
+        dedupe_mode=dedupe_mode,
+        attempts=0
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _wakeup.set()
+    return job
+
+
+def recover_stale_jobs(app):
+    """
+    Jobs whose worker stopped heart-beating (worker recycled, box restarted)
+    go back to the queue, or fail once they used up their attempts.
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=app.config["UPLOAD_JOB_STALE_SECONDS"])
+    params = {
+        "stale": stale_before,
+        "max_attempts": app.config["UPLOAD_MAX_ATTEMPTS"],
+        "now": datetime.utcnow(),
+    }
+
+    requeued = db.session.execute(text("""
+        UPDATE upload_jobs
+        SET status = 'queued', claimed_by = NULL
+        WHERE status = 'processing'
+          AND COALESCE(heartbeat_at, created_at) < :stale
+          AND file_paths IS NOT NULL
+          AND attempts < :max_attempts
+    """), params).rowcount
+
+    # out of attempts, or legacy rows from the thread-per-upload days
+    failed = db.session.execute(text("""
+        UPDATE upload_jobs
+        SET status = 'failed', finished_at = :now,
+            last_error = COALESCE(last_error, 'worker lost')
+        WHERE status = 'processing'
+          AND COALESCE(heartbeat_at, created_at) < :stale
+    """), params).rowcount
+
+    db.session.commit()
+
+    if requeued or failed:
+        app.logger.warning(f"Upload queue: requeued {requeued}, failed {failed} stale jobs")
+
+
+def claim_next_job(app):
+    """
+    Atomically move one queued job to processing for this worker.
+    The conditional UPDATE is the lock: only one worker sees rowcount == 1,
+    and the UPLOAD_MAX_RUNNING cap is checked inside the same statement.
+    """
+    cap = app.config["UPLOAD_MAX_RUNNING"]
+
+    # cheap early exit; the UPDATE below is what enforces the cap
+    running = db.session.execute(text(
+        "SELECT COUNT(*) FROM upload_jobs WHERE status = 'processing'"
+    )).scalar()
+    if running >= cap:
+        return None
+
+    candidates = db.session.execute(text("""
+        SELECT id FROM upload_jobs
+        WHERE status = 'queued'
+        ORDER BY id
+        LIMIT 5
+    """)).scalars().all()
+
+    me = worker_id()
+    for job_id in candidates:
+        now = datetime.utcnow()
+        claimed = db.session.execute(text("""
+            UPDATE upload_jobs
+            SET status = 'processing', claimed_by = :me,
+                heartbeat_at = :now, started_at = :now,
+                attempts = COALESCE(attempts, 0) + 1
+            WHERE id = :id AND status = 'queued'
+              AND (SELECT COUNT(*) FROM upload_jobs WHERE status = 'processing') < :cap
+        """), {"id": job_id, "me": me, "now": now, "cap": cap}).rowcount
+        db.session.commit()
+
+        if claimed == 1:
+            return db.session.get(UploadJob, job_id)
+
+    return None
+
+
+class JobClaimLost(Exception):
+    """
+    The job was requeued (stale heartbeat) and belongs to another claim now.
+    """
+
+
+def check_claim(job_id, claim):
+    """
+    Confirm, inside the caller's transaction, that `claim` ((claimed_by,
+    attempts) at claim time) still owns the job, and heart-beat it. Raises
+    JobClaimLost otherwise so the caller rolls back instead of writing next
+    to the new owner. The row lock taken here holds until the commit.
+    """
+    if claim is None:
+        return
+    me, attempt = claim
+    # before the caller's pending job changes (e.g. status = 'done') flush
+    with db.session.no_autoflush:
+        owned = db.session.execute(text("""
+            UPDATE upload_jobs SET heartbeat_at = :now
+            WHERE id = :id AND status = 'processing'
+              AND claimed_by = :me AND attempts = :attempt
+        """), {"id": job_id, "me": me, "attempt": attempt, "now": datetime.utcnow()}).rowcount
+    if owned != 1:
+        raise JobClaimLost(f"upload job {job_id} is no longer claimed by {me} (attempt {attempt})")
+
+
+def run_job(app, job):
+    # imported here: file_routes imports this module for enqueue_upload_job
+    from file_routes import process_files_background
+
+    job_id = job.id
+    claim = (job.claimed_by, job.attempts)
+    try:
+        process_files_background(
+            app, json.loads(job.file_paths), job.table_name, job.user_id, job_id,
+            json.loads(job.file_hashes) if job.file_hashes else None, claim
+        )
+    except JobClaimLost as e:
+        # the new owner redoes the job; leave its row alone
+        db.session.rollback()
+        app.logger.warning(f"Upload job {job_id} abandoned: {e}")
+    except Exception as e:
+        db.session.rollback()
+        try:
+            check_claim(job_id, claim)
+        except JobClaimLost as lost:
+            db.session.rollback()
+            app.logger.warning(f"Upload job {job_id} failed after losing its claim ({lost}): {e}")
+            return
+        job = db.session.get(UploadJob, job_id)
+        job.last_error = str(e)
+
+        if (job.attempts or 0) < app.config["UPLOAD_MAX_ATTEMPTS"]:
+            job.status = "queued"
+            job.claimed_by = None
+        else:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+
+        state = upload_job_state(job)
+        db.session.commit()
+        job_events.publish(job_id, "progress", state)
+        app.logger.error(f"Upload job {job_id} attempt {job.attempts} failed: {e}")
+
+
+def start_job_workers(app):
+    """
+    Start UPLOAD_WORKERS daemon threads in this process. Each one recovers
+    stale jobs, claims the next queued job and runs it, then polls again.
+    """
+    poll = app.config["UPLOAD_POLL_SECONDS"]
+
+    def worker():
+        while True:
+            with app.app_context():
+                try:
+                    recover_stale_jobs(app)
+                    job = claim_next_job(app)
+                    if job is not None:
+                        run_job(app, job)
+                        continue
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"Upload worker error: {e}")
+                finally:
+                    db.session.remove()
+
+            _wakeup.wait(poll)
+            _wakeup.clear()
+
+    threads = []
+    for i in range(app.config["UPLOAD_WORKERS"]):
+        t = Thread(target=worker, name=f"upload-worker-{i}", daemon=True)
+        t.start()
+        threads.append(t)
+    return threads
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from config import Config
 from models import User
 from extensions import db
+from utils.cache_utils import TTLCache
 
 # ---------------------------
 # Token helpers
@@ -50,6 +51,75 @@ def get_token_from_header():
     return request.args.get("token")
 
 
+# ---------------------------
+# Authenticated-user cache
+# ---------------------------
+class AuthUser:
+    """
+    The auth-relevant fields of a User row, safe to keep between requests
+    (not bound to a session). Routes that change the user load the row.
+    """
+    __slots__ = ("id", "email", "name", "is_admin", "is_active", "expiry_date")
+
+    def __init__(self, user):
+        self.id = user.id
+        self.email = user.email
+        self.name = user.name
+        self.is_admin = user.is_admin
+        self.is_active = user.is_active
+        self.expiry_date = user.expiry_date
+
+
+# (user id, token iat) -> AuthUser
+auth_cache = TTLCache(maxsize=Config.AUTH_CACHE_SIZE, ttl=Config.AUTH_CACHE_TTL)
+
+
+def load_auth_user(payload):
+    """
+    AuthUser for a decoded token, or None if the user does not exist.
+    A cache hit costs a dict lookup instead of a query.
+    """
+    try:
+        user_id = int(payload.get("sub"))
+    except Exception:
+        return None
+
+    key = (user_id, payload.get("iat"))
+    user = auth_cache.get(key)
+    if user is None:
+        row = db.session.get(User, user_id)
+        if row is None:
+            return None
+        user = AuthUser(row)
+        auth_cache.set(key, user)
+    return user
+
+
+def invalidate_auth_user(user_id):
+    """
+    Forget cached auth state of a user (all tokens). Call after changing
+    is_active / is_admin / expiry_date or deleting the user.
+    """
+    auth_cache.discard_if(lambda key: key[0] == user_id)
+
+
+def is_expired(user):
+    """
+    True if the account's expiry_date passed; deactivates it once.
+    """
+    expiry = user.expiry_date
+    if not (expiry and isinstance(expiry, datetime) and datetime.utcnow() > expiry):
+        return False
+
+    if user.is_active:
+        row = db.session.get(User, user.id)
+        if row is not None and row.is_active:
+            row.is_active = False
+            db.session.commit()
+        invalidate_auth_user(user.id)
+    return True
+
+
 # ---------------------------
 # Decorators
 # ---------------------------
@@ -64,26 +134,17 @@ def jwt_required(f):
         if not payload:
             return jsonify({"error": "Invalid or expired token"}), 401
 
-        user_id = payload.get("sub")
-        try:
-            user = User.query.get(int(user_id))
-        except Exception:
-            user = None
-
+        user = load_auth_user(payload)
         if not user:
             return jsonify({"error": "User not found"}), 401
 
         # expiry_date handling: if expiry_date exists and passed, deactivate
         try:
-            expiry = getattr(user, "expiry_date", None)
-            if expiry and isinstance(expiry, datetime) and datetime.utcnow() > expiry:
-                if user.is_active:
-                    user.is_active = False
-                    db.session.commit()
+            if is_expired(user):
                 return jsonify({"error": "Account expired. Contact admin."}), 403
         except Exception:
             # don't block on expiry check error
-            pass
+            db.session.rollback()
 
         if not user.is_active:
             return jsonify({"error": "User inactive. Contact admin."}), 403
@@ -108,25 +169,16 @@ def admin_required(f):
         if payload.get("role") != "admin":
             return jsonify({"error": "Admin access required"}), 403
 
-        user_id = payload.get("sub")
-        try:
-            user = User.query.get(int(user_id))
-        except Exception:
-            user = None
-
+        user = load_auth_user(payload)
         if not user or not user.is_admin:
             return jsonify({"error": "Admin not found"}), 403
 
         # expiry_date handling for admin too (optional)
         try:
-            expiry = getattr(user, "expiry_date", None)
-            if expiry and isinstance(expiry, datetime) and datetime.utcnow() > expiry:
-                if user.is_active:
-                    user.is_active = False
-                    db.session.commit()
+            if is_expired(user):
                 return jsonify({"error": "Admin account expired"}), 403
         except Exception:
-            pass
+            db.session.rollback()
 
         g.current_user = user
         return f(*args, **kwargs)
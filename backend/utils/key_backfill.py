@@ -0,0 +1,50 @@
+from sqlalchemy import select, update, bindparam
+
+from models import db, Document
+from extractor import natural_key
+
+
+def backfill_natural_keys(user_id=None, batch_size=5000):
+    """
+    Fill documents.natural_key for rows stored without one (uploads from
+    before every upload recorded it), so dedupe=skip / update uploads
+    recognise them. Rows without a complete key stay NULL. Walks the table
+    by id and commits per batch. Returns (rows scanned, rows keyed).
+    """
+    t = Document.__table__
+    stmt = (
+        update(t)
+        .where(t.c.id == bindparam("row_id"))
+        .values(natural_key=bindparam("key"))
+    )
+
+    scanned = keyed = 0
+    last_id = 0
+    while True:
+        query = (
+            select(t.c.id, t.c.sroname, t.c.docno, t.c.registrationdate)
+            .where(t.c.id > last_id, t.c.natural_key.is_(None))
+            .order_by(t.c.id)
+            .limit(batch_size)
+        )
+        if user_id is not None:
+            query = query.where(t.c.user_id == user_id)
+
+        rows = db.session.execute(query).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        scanned += len(rows)
+
+        changes = []
+        for r in rows:
+            key = natural_key(r._mapping)
+            if key is not None:
+                changes.append({"row_id": r.id, "key": key})
+
+        if changes:
+            db.session.execute(stmt, changes)
+            keyed += len(changes)
+        db.session.commit()
+
+    return scanned, keyed
@@ -0,0 +1,282 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+from sqlalchemy import select, insert, delete, bindparam, text
+
+from models import db, Document, PartyNameKey
+
+# =========================================================
+# DEVANAGARI → LATIN
+# A plain letter-by-letter scheme (close to how registry clerks romanize
+# Marathi names); the phonetic key below irons out the differences.
+# =========================================================
+CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "ळ": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+
+VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ii", "उ": "u", "ऊ": "uu",
+    "ऋ": "ru", "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o", "ॲ": "e",
+}
+
+MATRAS = {
+    "ा": "aa", "ि": "i", "ी": "ii", "ु": "u", "ू": "uu", "ृ": "ru",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॉ": "o", "ॅ": "e",
+}
+
+VIRAMA = "्"
+NUKTA = "़"
+ANUSVARA = "ं"
+CHANDRABINDU = "ँ"
+VISARGA = "ः"
+LABIALS = set("पफबभम")
+
+
+def transliterate(text):
+    """
+    Devanagari → lowercase Latin ('रमेश पाटील' → 'ramesha paatiila');
+    Latin text is only lowercased.
+    """
+    out = []
+    # nukta letters (ज़, फ़) read as their base consonant
+    chars = unicodedata.normalize("NFC", text or "").replace(NUKTA, "")
+    n = len(chars)
+    for i, ch in enumerate(chars):
+        nxt = chars[i + 1] if i + 1 < n else ""
+        if ch in CONSONANTS:
+            out.append(CONSONANTS[ch])
+            if nxt in MATRAS:
+                out.append(MATRAS[nxt])
+            elif nxt != VIRAMA:
+                out.append("a")           # inherent vowel
+        elif ch in VOWELS:
+            out.append(VOWELS[ch])
+        elif ch in (ANUSVARA, CHANDRABINDU):
+            # nasal takes the place of the next consonant: संभाजी → sambhaajii
+            out.append("m" if nxt in LABIALS else "n")
+        elif ch == VISARGA:
+            out.append("h")
+        elif ch in MATRAS or ch == VIRAMA:
+            pass                          # consumed with their consonant
+        elif "०" <= ch <= "९":
+            out.append(str(ord(ch) - ord("०")))
+        else:
+            out.append(ch.lower())
+    return "".join(out)
+
+
+# =========================================================
+# NORMALIZED TOKENS + PHONETIC KEY
+# =========================================================
+# honorifics / markers that are not part of the name
+STOP_TOKENS = {
+    "shri", "shree", "shrii", "sri", "smt", "shrimati", "shriimatii", "sau", "kum",
+    "mr", "mrs", "ms", "dr", "late", "kai", "va", "and",
+}
+
+# longest first: 'chh' before 'ch' before 'c'
+PHONETIC_RULES = [
+    ("chh", "c"), ("ch", "c"), ("kh", "k"), ("gh", "g"), ("jh", "j"),
+    ("th", "t"), ("dh", "d"), ("ph", "f"), ("bh", "b"), ("sh", "s"),
+    ("x", "ks"), ("q", "k"), ("z", "j"), ("w", "v"),
+]
+_PHONETIC_RE = re.compile("|".join(src for src, _ in PHONETIC_RULES))
+_PHONETIC_MAP = dict(PHONETIC_RULES)
+_VOWELS_RE = re.compile("[aeiouy]+")
+
+
+def name_tokens(text):
+    """
+    Transliterated, lowercased name tokens without honorifics.
+    """
+    tokens = re.split(r"[^0-9a-z]+", transliterate(text))
+    return [t for t in tokens if t and t not in STOP_TOKENS]
+
+
+@lru_cache(maxsize=65536)
+def phonetic_key(token):
+    """
+    Consonant skeleton of a Latin token: aspirates and common spelling
+    variants folded, vowels dropped after the first letter, doubled letters
+    collapsed. 'kulakarnii', 'Kulkarni' → 'klkrn'; 'paatiila', 'Patil' → 'ptl'.
+    """
+    s = _PHONETIC_RE.sub(lambda m: _PHONETIC_MAP[m.group(0)], token)
+    s = s[:1] + _VOWELS_RE.sub("", s[1:])
+    return re.sub(r"(.)\1+", r"\1", s)
+
+
+def party_name_keys(value):
+    """
+    [(token, phonetic)] for one party-name field, de-duplicated.
+    """
+    seen = {}
+    for t in name_tokens(value):
+        seen.setdefault(t, phonetic_key(t))
+    return list(seen.items())
+
+
+# =========================================================
+# SIDE TABLE MAINTENANCE
+# =========================================================
+def key_rows(rows):
+    """
+    party_name_keys rows for (id, user_id, purchasername, sellername) rows.
+    """
+    out = []
+    for r in rows:
+        for role, value in (("purchaser", r.purchasername), ("seller", r.sellername)):
+            for token, phonetic in party_name_keys(value):
+                out.append({
+                    "user_id": r.user_id, "document_id": r.id, "role": role,
+                    "token": token, "phonetic": phonetic,
+                })
+    return out
+
+
+def index_party_names(where, replace=False, limit=None):
+    """
+    (Re)build the name keys of the documents matching `where` (clauses on
+    the documents table), in id order. Runs in the caller's transaction.
+    Returns (documents indexed, last document id or None).
+    """
+    t = Document.__table__
+    query = (
+        select(t.c.id, t.c.user_id, t.c.purchasername, t.c.sellername)
+        .where(*where)
+        .order_by(t.c.id)
+    )
+    if limit:
+        query = query.limit(limit)
+
+    rows = db.session.execute(query).fetchall()
+    if not rows:
+        return 0, None
+
+    if replace:
+        remove_party_names([r.id for r in rows])
+
+    keys = key_rows(rows)
+    if keys:
+        db.session.execute(insert(PartyNameKey.__table__), keys)
+    return len(rows), rows[-1].id
+
+
+def index_file_party_names(file_id, batch_size=5000):
+    """
+    Name keys for every document of one file, walking it by id so only
+    `batch_size` rows are in memory at a time. Runs in the caller's
+    transaction. Returns the number of documents indexed.
+    """
+    t = Document.__table__
+    done = 0
+    last_id = 0
+    while True:
+        n, last = index_party_names([t.c.file_id == file_id, t.c.id > last_id], limit=batch_size)
+        if last is None:
+            return done
+        done += n
+        last_id = last
+
+
+def remove_party_names(document_ids, chunk_size=500):
+    k = PartyNameKey.__table__
+    stmt = delete(k).where(k.c.document_id.in_(bindparam("ids", expanding=True)))
+    for i in range(0, len(document_ids), chunk_size):
+        db.session.execute(stmt, {"ids": document_ids[i:i + chunk_size]})
+
+
+def remove_file_party_names(file_id):
+    db.session.execute(text("""
+        DELETE FROM party_name_keys
+        WHERE document_id IN (SELECT id FROM documents WHERE file_id = :file_id)
+    """), {"file_id": file_id})
+
+
+def rebuild_party_names(user_id=None, batch_size=5000):
+    """
+    Drop and recompute the name keys (all users, or one), walking documents
+    by id and committing per batch. Returns the number of documents indexed.
+    """
+    k = PartyNameKey.__table__
+    t = Document.__table__
+
+    clear = delete(k)
+    if user_id is not None:
+        clear = clear.where(k.c.user_id == user_id)
+    db.session.execute(clear)
+    db.session.commit()
+
+    done = 0
+    last_id = 0
+    while True:
+        where = [t.c.id > last_id]
+        if user_id is not None:
+            where.append(t.c.user_id == user_id)
+        n, last = index_party_names(where, limit=batch_size)
+        db.session.commit()
+        if last is None:
+            break
+        done += n
+        last_id = last
+    return done
+
+
+def ensure_party_names(app):
+    """
+    Name keys are computed in Python, so an existing database is not indexed
+    on startup (every worker would do it); point at the rebuild command.
+    """
+    try:
+        k = PartyNameKey.__table__
+        t = Document.__table__
+        no_keys = db.session.execute(select(k.c.id).limit(1)).first() is None
+        has_docs = db.session.execute(select(t.c.id).limit(1)).first() is not None
+        if no_keys and has_docs:
+            print("⚠ party_name_keys is empty: run `flask --app app rebuild-name-keys` "
+                  "for match=phonetic search on existing documents")
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"Could not check party name keys: {e}")
+
+
+# =========================================================
+# SEARCH
+# =========================================================
+def name_match_clause(value, role, mode, prefix, params):
+    """
+    SQL condition on d.id for one name filter answered from party_name_keys:
+    every token of `value` must match (in any order) for the same role.
+    mode "phonetic" compares phonetic keys, "translit" the normalized tokens.
+    Returns None when `value` has no name tokens (caller falls back to LIKE).
+    """
+    keys = party_name_keys(value)
+    if not keys:
+        return None
+
+    column = "phonetic" if mode == "phonetic" else "token"
+    wanted = sorted({phonetic if column == "phonetic" else token for token, phonetic in keys})
+
+    names = []
+    for i, key in enumerate(wanted):
+        names.append(f":{prefix}_{i}")
+        params[f"{prefix}_{i}"] = key
+    params[f"{prefix}_n"] = len(wanted)
+
+    role_sql = ""
+    if role is not None:
+        role_sql = f" AND k.role = :{prefix}_role"
+        params[f"{prefix}_role"] = role
+
+    return f"""d.id IN (
+            SELECT k.document_id FROM party_name_keys k
+            WHERE k.user_id = :user_id AND k.{column} IN ({", ".join(names)}){role_sql}
+            GROUP BY k.document_id
+            HAVING COUNT(DISTINCT k.{column}) = :{prefix}_n
+        )"""
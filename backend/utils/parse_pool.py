@@ -0,0 +1,150 @@
+import atexit
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from threading import Lock, Timer
+
+from extractor import iter_row_batches
+
+# One pool (and one manager for the result queues) per web worker process,
+# created on first use and shared by the upload jobs of that process. It is
+# shut down once no job used it for `idle_seconds`, and at interpreter exit,
+# so idle web processes don't keep parser processes around.
+_pool = None
+_manager = None
+_pool_users = 0
+_idle_timer = None
+_pool_lock = Lock()
+
+
+def _acquire_pool(workers):
+    global _pool, _manager, _pool_users, _idle_timer
+    with _pool_lock:
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+            _idle_timer = None
+        if _pool is None:
+            # spawn: never fork a process that holds DB connections and threads
+            ctx = get_context("spawn")
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+            try:
+                _manager = ctx.Manager()
+            except Exception:
+                pool.shutdown(wait=False)
+                raise
+            _pool = pool
+        _pool_users += 1
+        return _pool, _manager
+
+
+def _release_pool(idle_seconds):
+    global _pool_users, _idle_timer
+    with _pool_lock:
+        _pool_users -= 1
+        if _pool_users == 0 and _pool is not None:
+            _idle_timer = Timer(idle_seconds, _shutdown_if_idle)
+            _idle_timer.daemon = True
+            _idle_timer.start()
+
+
+def _shutdown_if_idle():
+    with _pool_lock:
+        if _pool_users == 0:
+            _shutdown_locked()
+
+
+def _shutdown_locked():
+    global _pool, _manager
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    if _manager is not None:
+        _manager.shutdown()
+    _pool, _manager = None, None
+
+
+def _reset_pool():
+    with _pool_lock:
+        _shutdown_locked()
+
+
+atexit.register(_reset_pool)
+
+
+def parse_file_worker(path, idx, batch_size, out):
+    """
+    Runs in a pool process: parse one file and push its batches to `out`.
+    The queue is bounded, so a slow DB writer throttles the parsers.
+    """
+    try:
+        for batch in iter_row_batches(path, batch_size):
+            out.put(("rows", idx, batch))
+        out.put(("done", idx, None))
+    except Exception as e:
+        out.put(("error", idx, str(e)))
+
+
+def iter_parsed_batches(paths, batch_size, workers=1, idle_seconds=300):
+    """
+    Yield (kind, file_index, payload) events for every file in `paths`:
+      ("rows", i, [rec, ...])  a parsed batch
+      ("done", i, None)        file finished
+      ("error", i, message)    file failed (earlier batches were already yielded)
+
+    workers <= 1 (or a single file) parses inline in the calling thread;
+    otherwise files are parsed in parallel by the process pool and the
+    caller (the single DB writer) consumes batches as they arrive. The
+    pool is shut down after `idle_seconds` without a job.
+    """
+    if workers <= 1 or len(paths) <= 1:
+        for idx, path in enumerate(paths):
+            try:
+                for batch in iter_row_batches(path, batch_size):
+                    yield ("rows", idx, batch)
+                yield ("done", idx, None)
+            except Exception as e:
+                yield ("error", idx, str(e))
+        return
+
+    pool, manager = _acquire_pool(workers)
+    futures = {}
+    broken = False
+
+    try:
+        out = manager.Queue(maxsize=workers * 2)
+        futures = {
+            pool.submit(parse_file_worker, path, idx, batch_size, out): idx
+            for idx, path in enumerate(paths)
+        }
+        pending = set(range(len(paths)))
+
+        while pending:
+            try:
+                event = out.get(timeout=1)
+            except queue.Empty:
+                # a worker that died (OOM, BrokenProcessPool) never reports back
+                for fut, idx in futures.items():
+                    if idx in pending and fut.done() and fut.exception() is not None:
+                        pending.discard(idx)
+                        if isinstance(fut.exception(), BrokenProcessPool):
+                            broken = True
+                        yield ("error", idx, str(fut.exception()) or "parser process died")
+                continue
+
+            kind, idx, _ = event
+            if kind in ("done", "error"):
+                pending.discard(idx)
+            yield event
+    finally:
+        for fut in futures:
+            fut.cancel()
+        # unblock workers still waiting on a full queue (consumer stopped early)
+        while any(not fut.done() for fut in futures):
+            try:
+                out.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        if broken:
+            # replace the dead pool for the next job
+            _reset_pool()
+        _release_pool(idle_seconds)
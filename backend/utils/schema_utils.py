@@ -0,0 +1,137 @@
+from sqlalchemy import inspect, text, Integer, Text, String, Date, DateTime
+
+# Columns added to existing tables after their first release.
+# db.create_all() only creates missing tables, so older databases get these
+# through ALTER TABLE on startup. (table, column, type, SQL default)
+ADDED_COLUMNS = [
+    ("upload_jobs", "processed_rows", Integer(), "0"),
+    ("upload_jobs", "file_paths", Text(), None),
+    ("upload_jobs", "attempts", Integer(), "0"),
+    ("upload_jobs", "claimed_by", String(120), None),
+    ("upload_jobs", "heartbeat_at", DateTime(), None),
+    ("upload_jobs", "started_at", DateTime(), None),
+    ("upload_jobs", "finished_at", DateTime(), None),
+    ("upload_jobs", "last_error", Text(), None),
+    ("uploaded_files", "job_id", Integer(), None),
+    ("uploaded_files", "content_hash", String(64), None),
+    ("upload_jobs", "file_hashes", Text(), None),
+    ("upload_jobs", "duplicate_files", Integer(), "0"),
+    ("upload_jobs", "dedupe_mode", String(10), "'off'"),
+    ("upload_jobs", "rows_inserted", Integer(), "0"),
+    ("upload_jobs", "rows_updated", Integer(), "0"),
+    ("upload_jobs", "rows_skipped", Integer(), "0"),
+    ("documents", "natural_key", String(), None),
+    ("documents", "registration_year", Integer(), None),
+    ("documents", "registration_date", Date(), None),
+    ("documents", "execution_date", Date(), None),
+    ("export_jobs", "entry_ids", Text(), None),
+    ("export_jobs", "claimed_by", String(120), None),
+    ("export_jobs", "heartbeat_at", DateTime(), None),
+    ("export_jobs", "attempts", Integer(), "0"),
+]
+
+# One-off fills for a column right after ALTER TABLE added it, per dialect.
+COLUMN_BACKFILLS = {
+    ("documents", "registration_year"): {
+        "sqlite": """
+            UPDATE documents
+            SET registration_year = CAST(substr(registrationdate, 1, 4) AS INTEGER)
+            WHERE registrationdate GLOB '[0-9][0-9][0-9][0-9]-*'
+        """,
+        "postgresql": """
+            UPDATE documents
+            SET registration_year = CAST(substr(registrationdate, 1, 4) AS INTEGER)
+            WHERE registrationdate ~ '^[0-9]{4}-'
+        """,
+    },
+}
+
+# Columns filled outside startup (too slow, or they need Python parsing):
+# printed as a reminder when the column is added.
+COLUMN_HINTS = {
+    ("documents", "registration_date"): "run `flask --app app backfill-dates`",
+    ("documents", "natural_key"): "run `flask --app app backfill-natural-keys`",
+}
+
+# Indexes replaced by a model change; dropped when still present.
+# {index name: follow-up hint or None}
+DROPPED_INDEXES = {
+    # only unique while "off" uploads left natural_key NULL
+    "ux_documents_user_natural_key":
+        "run `flask --app app backfill-natural-keys` so dedupe uploads match older rows",
+}
+
+# Data fix-ups that must run before a new unique index can be built on an
+# existing database. {index name: SQL}
+INDEX_FIXUPS = {
+    # keep the oldest of any duplicated selection
+    "ux_selected_entries_user_document": """
+        DELETE FROM selected_entries
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM selected_entries GROUP BY user_id, document_id
+        )
+    """,
+}
+
+
+def ensure_columns(db):
+    """
+    Add any column from ADDED_COLUMNS that an existing database lacks, then
+    create model indexes that are missing (create_all skips existing tables).
+    Safe to call every startup.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    existing = {}
+
+    for table, column, col_type, default in ADDED_COLUMNS:
+        if table not in tables:
+            continue
+        if table not in existing:
+            existing[table] = {c["name"] for c in inspector.get_columns(table)}
+        if column in existing[table]:
+            continue
+
+        ddl = col_type.compile(dialect=engine.dialect)
+        if default is not None:
+            ddl += f" DEFAULT {default}"
+
+        db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        existing[table].add(column)
+        print(f"✔ Added column {table}.{column}")
+
+        backfill = COLUMN_BACKFILLS.get((table, column), {}).get(engine.dialect.name)
+        if backfill:
+            filled = db.session.execute(text(backfill)).rowcount
+            print(f"✔ Filled {table}.{column} for {filled} rows")
+
+        hint = COLUMN_HINTS.get((table, column))
+        if hint:
+            print(f"⚠ {table}.{column} is empty for existing rows: {hint}")
+
+    db.session.commit()
+
+    for name, hint in DROPPED_INDEXES.items():
+        if any(name in {ix["name"] for ix in inspector.get_indexes(t)} for t in tables):
+            db.session.execute(text(f"DROP INDEX {name}"))
+            db.session.commit()
+            print(f"✔ Dropped index {name}")
+            if hint:
+                print(f"⚠ {hint}")
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue    # created by create_all with its indexes
+        have = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in have:
+                continue
+            fixup = INDEX_FIXUPS.get(index.name)
+            if fixup:
+                removed = db.session.execute(text(fixup)).rowcount
+                db.session.commit()
+                if removed:
+                    print(f"✔ Removed {removed} duplicate rows from {table.name} "
+                          f"(run `flask --app app reconcile-stats`)")
+            index.create(bind=engine)
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+from config import Config
+from models import db, UserDataVersion
+from utils.cache_utils import TTLCache
+
+# full /search responses per (user, data version, filters, page)
+result_cache = TTLCache(
+    maxsize=Config.SEARCH_RESULT_CACHE_SIZE,
+    ttl=Config.SEARCH_RESULT_CACHE_TTL
+)
+
+# total + docname groups per filter signature, reused by page 2..N
+facet_cache = TTLCache(
+    maxsize=Config.SEARCH_FACET_CACHE_SIZE,
+    ttl=Config.SEARCH_FACET_CACHE_TTL
+)
+
+
+def get_data_version(user_id):
+    """
+    Current data version of a user (0 if the user never ingested anything).
+    Part of every cache key, so a bump invalidates all cached searches at once,
+    in every worker process.
+    """
+    row = db.session.get(UserDataVersion, user_id)
+    return row.version if row else 0
+
+
+def bump_data_version(user_id):
+    """
+    Mark the user's documents as changed. Runs inside the caller's transaction;
+    the caller commits together with the rows that caused the change.
+    """
+    db.session.execute(text("""
+        INSERT INTO user_data_versions (user_id, version, updated_at)
+        VALUES (:uid, 1, :now)
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = user_data_versions.version + 1, updated_at = :now
+    """), {"uid": user_id, "now": datetime.utcnow()})
+
+
+def cache_stats():
+    return {
+        "search_results": result_cache.stats(),
+        "search_facets": facet_cache.stats(),
+    }
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+from models import db, UserStats
+
+
+def add_user_stats(user_id, documents=0, selected=0, uploads=0):
+    """
+    Apply deltas to a user's dashboard counters. Runs inside the caller's
+    transaction, so the counters commit (or roll back) with the rows.
+    """
+    if not (documents or selected or uploads):
+        return
+    db.session.execute(text("""
+        INSERT INTO user_stats (user_id, documents, selected, uploads, updated_at)
+        VALUES (:uid, :documents, :selected, :uploads, :now)
+        ON CONFLICT (user_id)
+        DO UPDATE SET documents = user_stats.documents + :documents,
+                      selected = user_stats.selected + :selected,
+                      uploads = user_stats.uploads + :uploads,
+                      updated_at = :now
+    """), {
+        "uid": user_id, "documents": documents, "selected": selected,
+        "uploads": uploads, "now": datetime.utcnow()
+    })
+
+
+def reconcile_user_stats(user_id=None):
+    """
+    Recount the counters from the base tables, for one user or everyone.
+    Returns the number of users recomputed. Caller commits.
+    """
+    where = "WHERE u.id = :uid" if user_id is not None else ""
+    params = {"uid": user_id, "now": datetime.utcnow()}
+
+    db.session.execute(text(
+        "DELETE FROM user_stats" + (" WHERE user_id = :uid" if user_id is not None else "")
+    ), params)
+
+    return db.session.execute(text(f"""
+        INSERT INTO user_stats (user_id, documents, selected, uploads, updated_at)
+        SELECT u.id,
+               (SELECT COUNT(*) FROM documents d WHERE d.user_id = u.id),
+               (SELECT COUNT(*) FROM selected_entries s WHERE s.user_id = u.id),
+               (SELECT COUNT(*) FROM uploaded_files f WHERE f.user_id = u.id),
+               :now
+        FROM "user" u
+        {where}
+    """), params).rowcount
+
+
+def ensure_user_stats(app):
+    """
+    First start with the user_stats table: count everything once, so the
+    deltas applied from now on start from the right numbers.
+    """
+    try:
+        if db.session.execute(text("SELECT COUNT(*) FROM user_stats")).scalar() == 0:
+            n = reconcile_user_stats()
+            db.session.commit()
+            if n:
+                print(f"✔ Initialized dashboard stats for {n} user(s)")
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"Could not initialize user stats: {e}")
+
+
+def get_user_stats(user_id):
+    """
+    The user's counters; computed once from the base tables if the user has
+    no stats row yet (accounts that predate the table).
+    """
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        reconcile_user_stats(user_id)
+        db.session.commit()
+        stats = db.session.get(UserStats, user_id)
+    return stats
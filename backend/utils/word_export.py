@@ -0,0 +1,217 @@
+import re
+import zipfile
+from functools import lru_cache
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from docx import Document as WordDoc
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Pt
+
+# Marathi → English mapping
+DOCNAME_MAP = {
+    "Agreement Relating to Deposit of Title Deeds,Pawn": "Notice of Intimation",
+    "Notice of Intimation": "Notice of Intimation",
+
+    "डिपॉझिट": "Mortgage Deed",
+    "गहाणखत": "Mortgage Deed",
+    "बक्षीसपत्र": "Mortgage Deed",
+    "जामाखत": "Mortgage Deed",
+    "फर्दर चार्ज": "Mortgage Deed",
+    "रीकन्वेअन्स": "Reconveyance",
+    "घोषणापत्र": "Declaration Deed",
+    "हक्कसोड पत्र": "Release Deed",
+    "खरेदीखत": "Sale Deed",
+    "बक्षीसपत्र": "Gift Deed",
+    "भाडेपट्टा": "Lease Deed",
+    "करारनामा": "Agreement",
+    "परिमोचनपत्र":" Relees Deed",
+    "संमती पत्र": "Consent Deed",
+    "लिव्ह अँड लायसेन्स": "Leave and Licence",
+    "सुधार पत्र": "Correction Deed",
+    "ताबा पत्र": "Possession Letter",
+    "मान्यतापत्र":"Consent Deed",
+    "1236-अ-लिव्ह अॅन्ड लायसन्सेस":"Leave and Licence",
+    "वाडवाणी": "Partition Deed",
+    "राखणी नामा": "Partition Deed",
+    "चुक दुरतस्ती":"Correction Deed",
+    "रद्दपत्र": "Cancellation Deed",
+    "अधिकार हस्तांतरणाची विक्री": "Sale Deed",
+    "अभिहस्तांतरणपत्र": "Gift Deed",
+    "अपार्टमेंट डीड":"Deed of Apartment",
+    "डीड ऑफ एक्स्चेंज": "Deed of Exchange",
+    "नोटीस ऑफ लिस पेंडेन्स": "Notice of Lease Pendency",
+}
+
+
+# =========================================================
+# PER-DEED TEXT
+# docnames and SRO names repeat thousands of times in a report;
+# their translations are computed once per distinct value.
+# =========================================================
+@lru_cache(maxsize=4096)
+def english_docname(docname):
+    return DOCNAME_MAP.get(docname.strip(), docname)
+
+
+@lru_cache(maxsize=4096)
+def sro_code(sroname):
+    # Convert SRO if Marathi
+    if "हवेली" in sroname or "haveli" in sroname.lower():
+        num = "".join([c for c in sroname if c.isdigit()])
+        return f"HVL {num}"
+    return ""
+
+
+def deed_title(d):
+    eng_docname = english_docname(d.docname or "")
+
+    # Extract year
+    year = ""
+    if d.registrationdate:
+        year = d.registrationdate.split("-")[0]
+
+    sro_eng = sro_code(d.sroname or "")
+
+    return f"{year} – {eng_docname} dated {d.registrationdate} (Reg. No {sro_eng} {d.docno}/{year})"
+
+
+# =========================================================
+# PYTHON-DOCX BUILDER (one object per paragraph / table / cell)
+# Reference layout for the template below; slow on big reports.
+# =========================================================
+def write_word_python(target, rows):
+    docx = WordDoc()
+    count = 0
+
+    for d in rows:
+        # Title
+        p = docx.add_paragraph(deed_title(d))
+        p.alignment = WD_ALIGN_PARAGRAPH.LEFT
+        run = p.runs[0]
+        run.bold = True
+        run.font.size = Pt(13)
+
+        # Table
+        table = docx.add_table(rows=1, cols=3)
+        table.autofit = True
+
+        hdr = table.rows[0].cells
+        hdr[0].text = d.sellername or ""
+        hdr[1].text = d.purchasername or ""
+        hdr[2].text = d.propertydescription or ""
+
+        docx.add_paragraph("\n")
+        count += 1
+
+    docx.save(target)
+    return count
+
+
+# =========================================================
+# TEMPLATE BUILDER
+# One deed is laid out once with python-docx (same calls as above) using
+# marker text; its body XML becomes a fragment that is filled by string
+# joins for every deed and streamed into word/document.xml. All other
+# parts of the package are copied from the template unchanged.
+# =========================================================
+_MARKERS = ("TITLE", "SELLER", "PURCHASER", "PROPERTY")
+_MARKER_RE = re.compile(r"<w:t(?: [^>]*)?>@@(%s)@@</w:t>" % "|".join(_MARKERS))
+
+# characters XML 1.0 does not allow (python-docx would refuse them too)
+_INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_template = None
+
+
+def _load_template():
+    """
+    (package parts, document.xml head, [fragment pieces], document.xml tail).
+    Fragment pieces alternate literal XML and marker names.
+    """
+    global _template
+    if _template is not None:
+        return _template
+
+    buf = BytesIO()
+    docx = WordDoc()
+    p = docx.add_paragraph("@@TITLE@@")     # title run carries the title formatting
+    p.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    run = p.runs[0]
+    run.bold = True
+    run.font.size = Pt(13)
+    table = docx.add_table(rows=1, cols=3)
+    table.autofit = True
+    hdr = table.rows[0].cells
+    hdr[0].text = "@@SELLER@@"
+    hdr[1].text = "@@PURCHASER@@"
+    hdr[2].text = "@@PROPERTY@@"
+    docx.add_paragraph("\n")
+    docx.save(buf)
+
+    with zipfile.ZipFile(buf) as zf:
+        parts = [(info, zf.read(info.filename)) for info in zf.infolist()]
+
+    xml = dict((i.filename, data) for i, data in parts)["word/document.xml"].decode("utf-8")
+    body_start = xml.index("<w:body>") + len("<w:body>")
+    body_end = xml.index("<w:sectPr")
+    head, fragment, tail = xml[:body_start], xml[body_start:body_end], xml[body_end:]
+
+    pieces = _MARKER_RE.split(fragment)     # literal, marker, literal, ...
+    _template = (parts, head, pieces, tail)
+    return _template
+
+
+def _text_xml(value):
+    """
+    Text of a run as WordprocessingML: escaped, line breaks and tabs as
+    <w:br/> / <w:tab/> like python-docx does.
+    """
+    value = _INVALID_XML_RE.sub("", escape(value))
+    if "\n" in value or "\r" in value or "\t" in value:
+        value = (
+            value.replace("\r\n", "\n")
+            .replace("\r", "\n")
+            .replace("\n", '</w:t><w:br/><w:t xml:space="preserve">')
+            .replace("\t", '</w:t><w:tab/><w:t xml:space="preserve">')
+        )
+    return f'<w:t xml:space="preserve">{value}</w:t>'
+
+
+def write_word(target, rows, chunk_deeds=500):
+    """
+    Build the Word report for `rows` (WORD_COLUMNS tuples) into a path or
+    file; same layout as write_word_python(). Returns the number of deeds.
+    """
+    parts, head, pieces, tail = _load_template()
+    count = 0
+
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as out:
+        for info, data in parts:
+            if info.filename != "word/document.xml":
+                out.writestr(info, data)
+                continue
+
+            with out.open(info.filename, "w") as doc:
+                doc.write(head.encode("utf-8"))
+
+                chunk = []
+                for d in rows:
+                    values = {
+                        "TITLE": deed_title(d),
+                        "SELLER": d.sellername or "",
+                        "PURCHASER": d.purchasername or "",
+                        "PROPERTY": d.propertydescription or "",
+                    }
+                    for i, piece in enumerate(pieces):
+                        chunk.append(_text_xml(values[piece]) if i % 2 else piece)
+                    count += 1
+
+                    if count % chunk_deeds == 0:
+                        doc.write("".join(chunk).encode("utf-8"))
+                        chunk = []
+
+                doc.write("".join(chunk).encode("utf-8"))
+                doc.write(tail.encode("utf-8"))
+
+    return count
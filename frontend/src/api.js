@@ -21,6 +21,7 @@ export const endpoints = {
   // --- EXPORTING ---
   exportExcel: `${API_BASE}/export/selected/excel`,
   exportWord: `${API_BASE}/export/selected/word`,
+  exportJobs: `${API_BASE}/export/jobs`,
 
   // --- PROFILE ---
   profile: `${API_BASE}/profile`,
@@ -436,7 +436,11 @@ async function saveEntryDirectly(row) {
   <div className="form-group f3">
     <label>Free Text Search</label>
     <div className="input-with-btn">
-      <input value={q} onChange={(e) => setQ(e.target.value)} />
+      <input
+        value={q}
+        onChange={(e) => setQ(e.target.value)}
+        placeholder="Any part of a name, number or description"
+      />
       <button type="button" className="mic-btn" onClick={voiceSearch}>
         <MdMic size={18} />
       </button>
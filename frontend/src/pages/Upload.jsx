@@ -92,7 +92,7 @@ export default function Upload() {
         return;
       }
 
-      startPolling(j.job_id);
+      startLongPoll(j.job_id);
 
     } catch (err) {
       showToast("Server not responding");
@@ -100,6 +100,75 @@ export default function Upload() {
     }
   }
 
+  /* ---------------- PROGRESS ---------------- */
+  function applyProgress(data) {
+    setStatus(`Processed ${data.processed} / ${data.total} files`);
+
+    // update file statuses
+    setFileStatuses(prev =>
+      prev.map((file, index) => {
+        if (index < data.processed && file.status === "waiting") {
+          return { ...file, status: "done" };
+        }
+        return file;
+      })
+    );
+
+    if (data.status === "done") {
+      setUploading(false);
+      setStatus(
+        data.dedupe && data.dedupe !== "off"
+          ? `Upload completed: ${data.inserted} new, ${data.updated} updated, ${data.skipped} already present.`
+          : "Upload completed. You can now search the data."
+      );
+      showToast("All files uploaded successfully!");
+      return true;
+    }
+
+    if (data.status === "failed") {
+      setUploading(false);
+      setStatus(`Upload failed: ${data.error || "unknown error"}`);
+      showToast("Upload failed");
+      return true;
+    }
+
+    return false;
+  }
+
+  function applyFileError(data) {
+    setFileStatuses(prev =>
+      prev.map((file, index) =>
+        index === data.file ? { ...file, status: "failed", error: data.error } : file
+      )
+    );
+  }
+
+  /* ---------------- LONG-POLL ---------------- */
+  // The server answers as soon as the job moves on (or after ~20s);
+  // ask again right away. Any error drops back to the 2s poll.
+  async function startLongPoll(jobId) {
+
+    let since = "";
+
+    while (true) {
+      let data;
+      try {
+        const res = await authFetch(
+          `${endpoints.upload}/status/${jobId}?wait=20&since=${encodeURIComponent(since)}`
+        );
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        data = await res.json();
+      } catch (e) {
+        startPolling(jobId);
+        return;
+      }
+
+      (data.file_errors || []).forEach(applyFileError);
+      if (applyProgress(data)) return;
+      since = data.version;
+    }
+  }
+
   /* ---------------- POLLING ---------------- */
   function startPolling(jobId) {
 
@@ -109,23 +178,8 @@ export default function Upload() {
         const res = await authFetch(`${endpoints.upload}/status/${jobId}`);
         const data = await res.json();
 
-        setStatus(`Processed ${data.processed} / ${data.total} files`);
-
-        // update file statuses
-        setFileStatuses(prev =>
-          prev.map((file, index) => {
-            if (index < data.processed) {
-              return { ...file, status: "done" };
-            }
-            return file;
-          })
-        );
-
-        if (data.status === "done") {
+        if (applyProgress(data)) {
           clearInterval(interval);
-          setUploading(false);
-          setStatus("Upload completed. You can now search the data.");
-          showToast("All files uploaded successfully!");
         }
 
       } catch (e) {
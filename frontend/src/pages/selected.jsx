@@ -1,6 +1,6 @@
 import React, { useEffect, useState, useContext } from "react";
 import { authFetch } from "../auth";
-import { endpoints } from "../api";
+import { endpoints, API_BASE } from "../api";
 import { FiTrash2 } from "react-icons/fi";
 import "../styles/Selected.css";
 
@@ -50,9 +50,9 @@ const activeGroup = groups.find((g) => g.table_name === active) || null;
           disabled={!activeGroup}
          onClick={() =>
   activeGroup &&
-  exportTo(
+  exportJob(
     activeGroup.rows,
-    endpoints.exportWord,
+    "docx",
     activeGroup.table_name   // ⭐ pass table name
   )
 }
@@ -144,27 +144,56 @@ const activeGroup = groups.find((g) => g.table_name === active) || null;
     showToast("Copied", "success");
   }
 
-  async function exportTo(rows, endpoint, tableName) {
+  // -------- EXPORT JOB: submit, wait, download the stored file --------
+  async function exportJob(rows, format, tableName) {
 
   if (!rows?.length) return showToast("No entries to export");
 
-  // send ids + table_name
-  const payload = {
-    entries: rows.map((r) => ({ id: r.document_id })),
-    table_name: tableName
-  };
+  const res = await authFetch(endpoints.exportJobs, {
+    method: "POST",
+    body: {
+      entries: rows.map((r) => ({ id: r.document_id })),
+      format,
+      table_name: tableName
+    }
+  });
 
-  const res = await authFetch(endpoint, { method: "POST", body: payload });
+  let job = await res.json();
 
   if (!res.ok) {
-    showToast("Export failed", "error");
+    showToast(job.error || "Export failed", "error");
+    return;
+  }
+
+  if (!job.cached) showToast("Preparing export...", "success", 60000);
+
+  while (job.status === "queued" || job.status === "running") {
+    await new Promise((r) => setTimeout(r, 1000));
+    const s = await authFetch(`${endpoints.exportJobs}/${job.job_id}`);
+    job = await s.json();
+  }
+
+  if (job.status !== "done") {
+    showToast(job.error || "Export failed", "error");
+    return;
+  }
+
+  const file = await authFetch(`${API_BASE}${job.download_url}`);
+  if (!file.ok) {
+    showToast("Download failed", "error");
     return;
   }
 
+  await downloadResponse(file, job.filename);
+  showToast("Download complete", "success");
+}
+
+  async function downloadResponse(res, fallbackName = "download.docx") {
+
   const blob = await res.blob();
 
   // -------- GET REAL FILENAME FROM FLASK --------
-  let filename = "download.docx";
+  let filename = fallbackName;
 
   const disposition = res.headers.get("Content-Disposition");
   if (disposition) {
@@ -182,8 +211,6 @@ const activeGroup = groups.find((g) => g.table_name === active) || null;
   a.remove();
 
   window.URL.revokeObjectURL(url);
-
-  showToast("Download complete", "success");
 }
   async function emailEntries(rows) {
     if (!rows?.length) return showToast("No entries to email");